@@ -7,7 +7,16 @@ import time
 import random
 #do zliczania
 import re
+import codecs
+import math
+import hashlib
+import heapq
+import functools
+import json
+import struct
+from array import array
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Wczytywanie argumentów 
 import sys
@@ -27,6 +36,20 @@ import os
 
 rich.traceback.install()
 
+# Wielkość kawałka pliku w trybie strumieniowym (w bajtach)
+CHUNK_SIZE = 1 << 20
+# Słowo na końcu kawałka może być ucięte - czeka na następny kawałek
+TAIL_RE = re.compile(r'\w+\Z')
+# Maksymalna wielkość fragmentu pliku dla jednego procesu w trybie --jobs
+SHARD_SIZE = 64 << 20
+# Białe znaki ASCII nigdy nie są częścią słowa ani znaku UTF-8, więc można na nich ciąć plik
+WHITESPACE_RE = re.compile(rb'\s')
+# Trwały indeks liczników słów: nagłówek, metadane JSON, liczniki uint64 i słowa (malejąco wg licznika)
+INDEX_MAGIC = b'WCIDX1\n'
+INDEX_DIR = '.wordcount_index'
+# Ile bajtów z końca zaindeksowanej części przeszukuje trailing_word
+SAMPLE_SIZE = 1 << 16
+
 #Loading txt file
 def load_text(file_name):
     text = []
@@ -41,15 +64,57 @@ def load_text(file_name):
         print(f"Wystąpił błąd: {e}")
     return text
 
+# Wczytywanie pliku kawałkami - w pamięci jest tylko jeden kawałek naraz
+def read_chunks(file_name, chunk_size=CHUNK_SIZE, progress=None, start=0, end=None):
+    # dekoder przyrostowy składa znaki UTF-8 rozcięte na granicy kawałków
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    with open(file_name, 'rb') as file:
+        file.seek(start)
+        remaining = end - start if end is not None else None
+        while data := file.read(chunk_size if remaining is None else min(chunk_size, remaining)):
+            if remaining is not None:
+                remaining -= len(data)
+            if progress is not None:
+                progress.update(len(data))
+            yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+# Podział pliku na zakresy bajtów, granice przesunięte do najbliższego białego znaku
+def shard_file(file_name, shard_size):
+    size = os.path.getsize(file_name)
+    bounds = [0]
+    with open(file_name, 'rb') as file:
+        while bounds[-1] + shard_size < size:
+            position = bounds[-1] + shard_size
+            file.seek(position)
+            while block := file.read(4096):
+                match = WHITESPACE_RE.search(block)
+                if match:
+                    position += match.start()
+                    break
+                position += len(block)
+            bounds.append(min(position, size))
+    if bounds[-1] < size:
+        bounds.append(size)
+    return [(file_name, start, end) for start, end in zip(bounds, bounds[1:])]
 # Wczytywanie argumentów z konsoli
 def parser_arguments():
     parser = argparse.ArgumentParser(description='Generate histogram from txt file')
-    parser.add_argument('filename', help='Filename to analyze')
+    parser.add_argument('filename', nargs='+', help='Filenames to analyze')
     parser.add_argument('--limit', '-l', type=int, default=10, help='Limit the number of words to display')
     parser.add_argument('--min', '-m',type=int, help='Minimum word length')
     parser.add_argument('--ignore', '-i', nargs='*', type=str, help='List of ingrored words')
     parser.add_argument("--must-include", '-mi', nargs="*", help="Words must include these characters.")
     parser.add_argument("--must-exclude", '-me', nargs="*", help="Words must not include these characters.")
+    parser.add_argument('--stream', '-s', action='store_true', help='Read the file in chunks instead of loading it whole')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Chunk size in bytes for --stream')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Number of processes counting file shards in parallel')
+    parser.add_argument('--approx', '-a', action='store_true', help='Approximate counts in fixed memory (Count-Min sketch + top-k)')
+    parser.add_argument('--memory-kb', type=int, default=1024, help='Sketch memory budget in KiB for --approx')
+    parser.add_argument('--depth', type=int, default=4, help='Number of sketch rows for --approx')
+    parser.add_argument('--capacity', type=int, help='Number of tracked top words for --approx (default: 10 x limit)')
+    parser.add_argument('--index', action='store_true', help='Use (and build or update) a persistent on-disk count index')
+    parser.add_argument('--index-dir', default=INDEX_DIR, help='Directory for --index files')
     args = parser.parse_args()
     return args
 
@@ -58,19 +123,291 @@ def display_parser_arguments(args):
     print(args)
     print("nazwa pliku: ",args.filename)
 
+# Filtr słów z argumentów - budowany raz: minimalna długość w wyrażeniu regularnym,
+# ignorowane słowa jako frozenset, wymagane/zakazane znaki jako jedno skompilowane wyrażenie
+def compile_filter(min_length, ignore_words, must_include, must_exclude):
+    word_re = re.compile(r'\b\w{%d,}\b' % max(min_length or 1, 1))
+    ignore = frozenset(ignore_words or ())
+    # pusta lista znaków: '(?!)' nie pasuje do niczego (jak any/all po pustej liście)
+    include = re.compile('|'.join(map(re.escape, must_include)) or '(?!)').search if must_include is not None else None
+    exclude = re.compile('|'.join(map(re.escape, must_exclude)) or '(?!)').search if must_exclude is not None else None
+
+    if not ignore and include is None and exclude is None:
+        return word_re, None
+
+    def accept(word):
+        return word not in ignore and \
+               (include is None or include(word) is not None) and \
+               (exclude is None or exclude(word) is None)
+    return word_re, accept
+
+def filtered_words(word_re, accept, text):
+    words = word_re.findall(text)
+    return words if accept is None else filter(accept, words)
+
 #Zliczanie słów
-def count_words(texts, min_length, ignore_words, must_include, must_exclude):
-    words = []
+def count_words(texts, min_length, ignore_words, must_include, must_exclude, make_counter=Counter):
+    word_re, accept = compile_filter(min_length, ignore_words, must_include, must_exclude)
+    word_counts = make_counter()
     # Pasek postępu dla przetwarzania tekstów
     for text in tqdm.tqdm(texts, desc="Processing texts", unit="text"):
-        for word in re.findall(r'\b\w+\b', text.lower()):
-            if len(word) >= min_length and \
-               (ignore_words is None or word not in ignore_words) and \
-               (must_include is None or any(c in word for c in must_include)) and \
-               (must_exclude is None or all(c not in word for c in must_exclude)):
-                words.append(word)
+        word_counts.update(filtered_words(word_re, accept, text.lower()))
+
+    return word_counts
+
+# Zliczanie słów strumieniowo - słowa trafiają od razu do licznika, bez całego tekstu i listy słów w pamięci
+def count_words_chunks(chunks, min_length, ignore_words, must_include, must_exclude, make_counter=Counter):
+    word_re, accept = compile_filter(min_length, ignore_words, must_include, must_exclude)
+    word_counts = make_counter()
+    tail = ''
+    for chunk in chunks:
+        text = (tail + chunk).lower()
+        match = TAIL_RE.search(text)
+        tail = text[match.start():] if match else ''
+        text = text[:match.start()] if match else text
+        word_counts.update(filtered_words(word_re, accept, text))
+    word_counts.update(filtered_words(word_re, accept, tail))
+    return word_counts
+
+def count_words_stream(file_name, min_length, ignore_words, must_include, must_exclude, chunk_size=CHUNK_SIZE,
+                       make_counter=Counter):
+    try:
+        with tqdm.tqdm(total=os.path.getsize(file_name), desc="Processing file", unit="B", unit_scale=True) as progress:
+            return count_words_chunks(read_chunks(file_name, chunk_size, progress),
+                                      min_length, ignore_words, must_include, must_exclude, make_counter)
+    except FileNotFoundError:
+        print(f"Plik '{file_name}' nie został znaleziony.")
+    return make_counter()
+
+def count_shard(shard, min_length, ignore_words, must_include, must_exclude, chunk_size, make_counter=Counter):
+    file_name, start, end = shard
+    return end - start, count_words_chunks(read_chunks(file_name, chunk_size, start=start, end=end),
+                                           min_length, ignore_words, must_include, must_exclude, make_counter)
+
+# Zliczanie w wielu procesach - każdy proces liczy swój fragment, liczniki są na końcu sumowane
+def count_words_parallel(file_names, min_length, ignore_words, must_include, must_exclude, jobs, chunk_size=CHUNK_SIZE,
+                         make_counter=Counter):
+    existing = []
+    for file_name in file_names:
+        if os.path.isfile(file_name):
+            existing.append(file_name)
+        else:
+            print(f"Plik '{file_name}' nie został znaleziony.")
+    total = sum(os.path.getsize(file_name) for file_name in existing)
+    # kilka fragmentów na proces, żeby procesy kończyły równo, a pasek postępu się przesuwał
+    shard_size = max(chunk_size, min(SHARD_SIZE, total // (jobs * 4) + 1))
+    shards = [shard for file_name in existing for shard in shard_file(file_name, shard_size)]
+
+    word_counts = make_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor, \
+         tqdm.tqdm(total=total, desc="Processing files", unit="B", unit_scale=True) as progress:
+        futures = [executor.submit(count_shard, shard, min_length, ignore_words, must_include, must_exclude, chunk_size,
+                                   make_counter)
+                   for shard in shards]
+        for future in as_completed(futures):
+            size, shard_counts = future.result()
+            word_counts.update(shard_counts)
+            progress.update(size)
+    return word_counts
+
+# Szkic Count-Min: depth wierszy po width liczników, słowo zwiększa po jednym liczniku w każdym wierszu.
+# Oszacowanie (minimum z wierszy) nigdy nie jest za małe, a za duże o więcej niż e/width * N
+# tylko z prawdopodobieństwem exp(-depth). Pamięć nie zależy od liczby różnych słów.
+class CountMinSketch:
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+
+    def indexes(self, word):
+        # stały skrót (nie hash(), który zmienia się między procesami), wiersze z podwójnego haszowania
+        digest = hashlib.blake2b(word.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, word, count=1):
+        self.total += count
+        estimate = None
+        for row, i in zip(self.rows, self.indexes(word)):
+            row[i] += count
+            estimate = row[i] if estimate is None else min(estimate, row[i])
+        return estimate
+
+    def estimate(self, word):
+        return min(row[i] for row, i in zip(self.rows, self.indexes(word)))
+
+    def merge(self, other):
+        for row, other_row in zip(self.rows, other.rows):
+            for i, value in enumerate(other_row):
+                row[i] += value
+        self.total += other.total
+
+# Przybliżony licznik: szkic Count-Min + ograniczony zbiór kandydatów na najczęstsze słowa (kopiec minimum).
+# Ma update() i most_common() jak Counter, więc działa z tym samym histogramem.
+class ApproximateCounter:
+    def __init__(self, memory_kb=1024, depth=4, capacity=1000):
+        self.sketch = CountMinSketch(max(1, memory_kb * 1024 // (8 * depth)), depth)
+        self.capacity = capacity
+        self.top = {}
+        # (oszacowanie, słowo) - wpis może być nieaktualny (za mały), poprawiany dopiero na szczycie kopca
+        self.heap = []
 
-    return Counter(words)
+    def minimum(self):
+        while self.heap[0][0] != self.top[self.heap[0][1]]:
+            word = self.heap[0][1]
+            heapq.heapreplace(self.heap, (self.top[word], word))
+        return self.heap[0]
+
+    def add(self, word, count=1):
+        estimate = self.sketch.add(word, count)
+        if word in self.top:
+            self.top[word] = estimate
+        elif len(self.top) < self.capacity:
+            self.top[word] = estimate
+            heapq.heappush(self.heap, (estimate, word))
+        elif estimate > self.minimum()[0]:
+            _, evicted = heapq.heapreplace(self.heap, (estimate, word))
+            del self.top[evicted]
+            self.top[word] = estimate
+
+    def update(self, words):
+        # jak Counter.update: inny ApproximateCounter jest dołączany, w przeciwnym razie zliczane są słowa
+        if isinstance(words, ApproximateCounter):
+            self.merge(words)
+            return
+        for word in words:
+            self.add(word)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        candidates = set(self.top) | set(other.top)
+        estimates = sorted(((self.sketch.estimate(word), word) for word in candidates), reverse=True)[:self.capacity]
+        self.top = {word: estimate for estimate, word in estimates}
+        self.heap = [(estimate, word) for word, estimate in self.top.items()]
+        heapq.heapify(self.heap)
+
+    def most_common(self, n=None):
+        return sorted(self.top.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def error_bounds(self):
+        return {
+            'total': self.sketch.total,
+            'max_overcount': math.e / self.sketch.width * self.sketch.total,
+            'confidence': 1 - math.exp(-self.sketch.depth),
+        }
+
+# Indeks na dysku - pełne liczniki bez filtrów, filtry nakładane dopiero przy zapytaniu
+def index_path(file_name, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, hashlib.sha1(os.path.abspath(file_name).encode('utf-8')).hexdigest() + '.idx')
+
+def content_hash(file_name, end, start=0, digest=None, chunk_size=CHUNK_SIZE):
+    # skrót bajtów [start, end) całego pliku (wykrywa też zmiany w środku); podany digest jest kontynuowany,
+    # więc po dopisaniu danych wystarczy doczytać nową część
+    digest = digest or hashlib.blake2b(digest_size=16)
+    with open(file_name, 'rb') as file:
+        file.seek(start)
+        remaining = end - start
+        while remaining > 0 and (data := file.read(min(chunk_size, remaining))):
+            digest.update(data)
+            remaining -= len(data)
+    return digest
+
+def trailing_word(file_name, end):
+    # słowo na samym końcu pliku - po dopisaniu danych może okazać się dłuższe
+    with open(file_name, 'rb') as file:
+        file.seek(max(0, end - SAMPLE_SIZE))
+        data = file.read(end - max(0, end - SAMPLE_SIZE))
+    match = TAIL_RE.search(data.decode('utf-8', errors='ignore'))
+    return match.group() if match else ''
+
+def save_index(path, meta, word_counts):
+    entries = sorted(word_counts.items(), key=lambda item: item[1], reverse=True)
+    meta_bytes = json.dumps(meta).encode('utf-8')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(INDEX_MAGIC)
+        file.write(struct.pack('<IQ', len(meta_bytes), len(entries)))
+        file.write(meta_bytes)
+        file.write(array('Q', (count for _, count in entries)).tobytes())
+        file.write('\n'.join(word for word, _ in entries).encode('utf-8'))
+    os.replace(path + '.tmp', path)
+    return entries
+
+def load_index(path):
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None, None
+    if not data.startswith(INDEX_MAGIC):
+        return None, None
+    offset = len(INDEX_MAGIC)
+    meta_length, n = struct.unpack_from('<IQ', data, offset)
+    offset += struct.calcsize('<IQ')
+    meta = json.loads(data[offset:offset + meta_length])
+    offset += meta_length
+    counts = array('Q')
+    counts.frombytes(data[offset:offset + 8 * n])
+    words = data[offset + 8 * n:].decode('utf-8').split('\n') if n else []
+    return meta, list(zip(words, counts))
+
+def update_index(file_name, index_dir=INDEX_DIR, jobs=1, chunk_size=CHUNK_SIZE):
+    path = index_path(file_name, index_dir)
+    stat = os.stat(file_name)
+    meta, entries = load_index(path)
+    if meta and meta['size'] == stat.st_size and meta['mtime'] == stat.st_mtime_ns:
+        return entries
+
+    # przyrostowo tylko gdy plik urósł, a dotychczas zindeksowana część jest bajt w bajt taka sama;
+    # ten sam rozmiar przy innym mtime (edycja w miejscu) albo zmieniony początek - liczymy od nowa
+    digest = None
+    if meta and stat.st_size > meta['size']:
+        digest = content_hash(file_name, meta['size'])
+        if digest.hexdigest() != meta['hash']:
+            digest = None
+
+    if digest is not None:
+        # plik tylko urósł - liczymy dopisane bajty, zaczynając od ostatniego (być może uciętego) słowa
+        word_counts = Counter(dict(entries))
+        tail = meta['tail'].lower()
+        if tail:
+            word_counts[tail] -= 1
+            if word_counts[tail] <= 0:
+                del word_counts[tail]
+        start = meta['size'] - len(meta['tail'].encode('utf-8'))
+        word_counts.update(count_words_chunks(read_chunks(file_name, chunk_size, start=start, end=stat.st_size),
+                                              None, None, None, None))
+    elif jobs > 1:
+        word_counts = count_words_parallel([file_name], None, None, None, None, jobs, chunk_size)
+    else:
+        word_counts = count_words_stream(file_name, None, None, None, None, chunk_size)
+
+    if digest is not None:
+        digest = content_hash(file_name, stat.st_size, start=meta['size'], digest=digest)
+    else:
+        digest = content_hash(file_name, stat.st_size)
+    meta = {
+        'path': os.path.abspath(file_name),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'hash': digest.hexdigest(),
+        'tail': trailing_word(file_name, stat.st_size),
+    }
+    return save_index(path, meta, word_counts)
+
+def query_index(entries, limit, min_length, ignore_words, must_include, must_exclude):
+    # wpisy są posortowane malejąco, więc wystarczy wziąć pierwsze `limit` pasujących słów
+    _, accept = compile_filter(min_length, ignore_words, must_include, must_exclude)
+    min_length = max(min_length or 1, 1)
+    top = Counter()
+    for word, count in entries:
+        if len(word) >= min_length and (accept is None or accept(word)):
+            top[word] = count
+            if len(top) == limit:
+                break
+    return top
 
 # Kolory do histogramu
 def get_word_color(count, max_count):
@@ -106,9 +443,40 @@ def draw_histogram(word_counts, top_n=10):
 def main():
     args = parser_arguments()
     display_parser_arguments(args)
-    text = load_text(args.filename)
-    word_counts = count_words(text, args.min, args.ignore, args.must_include, args.must_exclude)
+    make_counter = Counter
+    if args.approx:
+        make_counter = functools.partial(ApproximateCounter, memory_kb=args.memory_kb, depth=args.depth,
+                                         capacity=args.capacity or max(10 * args.limit, 100))
+    if args.index:
+        entries = []
+        for file_name in args.filename:
+            try:
+                entries.append(update_index(file_name, args.index_dir, args.jobs, args.chunk_size))
+            except FileNotFoundError:
+                print(f"Plik '{file_name}' nie został znaleziony.")
+        if len(entries) > 1:
+            merged = Counter()
+            for file_entries in entries:
+                merged.update(dict(file_entries))
+            entries = [merged.most_common()]
+        word_counts = query_index(entries[0] if entries else [], args.limit, args.min, args.ignore,
+                                  args.must_include, args.must_exclude)
+    elif args.jobs > 1:
+        word_counts = count_words_parallel(args.filename, args.min, args.ignore, args.must_include, args.must_exclude,
+                                           args.jobs, args.chunk_size, make_counter)
+    elif args.stream:
+        word_counts = make_counter()
+        for file_name in args.filename:
+            word_counts.update(count_words_stream(file_name, args.min, args.ignore, args.must_include,
+                                                  args.must_exclude, args.chunk_size, make_counter))
+    else:
+        text = [t for file_name in args.filename for t in load_text(file_name)]
+        word_counts = count_words(text, args.min, args.ignore, args.must_include, args.must_exclude, make_counter)
     draw_histogram(word_counts, args.limit)
+    if args.approx:
+        bounds = word_counts.error_bounds()
+        print(f"Liczby przybliżone: zawyżone o co najwyżej {bounds['max_overcount']:.1f} "
+              f"(z {bounds['total']} słów) z prawdopodobieństwem {bounds['confidence']:.1%}")
 
 if __name__ == "__main__":
     main()
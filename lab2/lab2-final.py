@@ -1,89 +1,213 @@
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 from rich.progress import track
 import os
+import json
+import sys
+
+# kernel Wolffa, tablica akceptacji i zapis obrazków, animacji i checkpointów wspólne z lab4 - jedna kopia dla obu implementacji
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lab4'))
+from lab4 import (acceptance_table, close_frame_writer, flush_frame_writer, open_frame_writer, save_npz, start_image_writer,
+                  stop_image_writer, submit_image, wolff_sweep, write_frame)
 
 class ModelIsinga():
-    def __init__(self, grid_size, J, beta, B, steps, spin_density = 0.5, filename_prefix = None, filename_animation = None, filename_magnetization = None, outputfolder = None):
+    def __init__(self, grid_size, J, beta, B, steps, spin_density = 0.5, filename_prefix = None, filename_animation = None, filename_magnetization = None, outputfolder = None, method = "sequential", image_scale = 1, seed = None, filename_checkpoint = None, checkpoint_every = 100, clusters = None):
         self.grid_size = grid_size
         self.J = J
-        self.beta = beta
-        self.B = B
+        self._beta = beta
+        self._B = B
+        self.acceptance = acceptance_table(J, beta, B)
         self.steps = steps
         self.spin_density = spin_density
         self.filename_prefix = filename_prefix
+        self.image_scale = image_scale # obrazki kroków zapisują co image_scale-ty spin w każdym kierunku
         self.filename_animation = filename_animation
         self.filename_magnetization = filename_magnetization
         self.outputfolder = outputfolder
+        self.method = method
+        self.clusters = clusters # klastrów na krok Wolffa, None - dobierane w rozgrzewce (lab4.wolff_sweep)
+        self.wolff_calibration = None
+        self.filename_checkpoint = filename_checkpoint # co checkpoint_every kroków zapis stanu, z którego load_checkpoint wznawia symulację
+        self.checkpoint_every = checkpoint_every
+        self.step_count = 0
+        self.animation_offset = 0
+        self.rng = np.random.default_rng(seed)
 
         #initialize spins with specified density
-        self.grid = np.random.choice([-1,1], size=(grid_size, grid_size), p=[1 - spin_density, spin_density]) #losowane elementy 1 lub -1 , p=prawdopodobieństwo -1 wynosi 1-spin_density, a 1 wynosi spindensity
+        self.grid = self.rng.choice(np.array([-1, 1], dtype=np.int64), size=(grid_size, grid_size), p=[1 - spin_density, spin_density]) #losowane elementy 1 lub -1 , p=prawdopodobieństwo -1 wynosi 1-spin_density, a 1 wynosi spindensity
         self.magnetization = []
-        self.frames = []
-        os.makedirs(self.outputfolder, exist_ok=True)
-        
-    def calculate_energy(self, x, y):
-        neighbors = [((x - 1) % self.grid_size, y), ((x + 1) % self.grid_size, y), 
-                     (x, (y - 1) % self.grid_size), (x, (y + 1) % self.grid_size)]  # % operacja modulo, jeżeli wyjdzie poza siatke to przerzuca na drugą stronę i leci dalej
-        interaction_energy = - self.J * self.grid[x,y] * (
-            self.grid[neighbors[0][0], neighbors[0][1]] + self.grid[neighbors[1][0], neighbors[1][1]] +
-            self.grid[neighbors[2][0], neighbors[2][1]] + self.grid[neighbors[3][0], neighbors[3][1]]) #neighbors wartości x,x,y,y sąsiedzi
-        field_energy = -self.B * self.grid[x, y]
-        return interaction_energy + field_energy # to jest moja zmiana energii, jak jest ujemna to zostaje jak jest, jak dodatnia to spin robi spin z prawdopodobieństwem
+        self.energy = []
+        self.reset_accumulators() # M i suma wiązań od razu, żeby step() działał też bez run()
+
+        if method == "checkerboard":
+            # szachownica: sąsiedzi każdego pola mają drugi kolor, więc cały kolor można obrócić naraz
+            if grid_size % 2:
+                raise ValueError("checkerboard method requires an even grid_size")
+            x, y = np.indices((grid_size, grid_size))
+            self.color_masks = [(x + y) % 2 == 0, (x + y) % 2 == 1]
+        elif method not in ("sequential", "wolff"):
+            raise ValueError(f"Unknown method: {method}")
+        if self.outputfolder:
+            os.makedirs(self.outputfolder, exist_ok=True)
+
+    # zmiana beta lub B (np. przy wyżarzaniu) od razu przelicza tablicę akceptacji:
+    # wiersz (s + 1) // 2 dla spinu s, kolumna (n + 4) // 2 dla sumy sąsiadów n
+    @property
+    def beta(self):
+        return self._beta
+
+    @beta.setter
+    def beta(self, value):
+        self._beta = value
+        self.acceptance = acceptance_table(self.J, self._beta, self._B)
+
+    @property
+    def B(self):
+        return self._B
+
+    @B.setter
+    def B(self, value):
+        self._B = value
+        self.acceptance = acceptance_table(self.J, self._beta, self._B)
+
+    def neighbors_sum(self, x, y):
+        # % operacja modulo, jeżeli wyjdzie poza siatke to przerzuca na drugą stronę i leci dalej
+        return (self.grid[(x - 1) % self.grid_size, y] + self.grid[(x + 1) % self.grid_size, y] +
+                self.grid[x, (y - 1) % self.grid_size] + self.grid[x, (y + 1) % self.grid_size])
     
     def step(self):
+        if self.method == "checkerboard":
+            self.step_checkerboard()
+        elif self.method == "wolff":
+            dM, dbonds, self.wolff_calibration = wolff_sweep(self.grid, self.J, self.beta, self.B, self.rng,
+                                                             self.clusters, self.wolff_calibration)
+            self.M += dM
+            self.bonds += dbonds
+        else:
+            self.step_sequential()
+
+    def step_sequential(self):
         #pojedynczy krok metody
         for _ in range(self.grid_size ** 2):
-            x, y = np.random.randint(0, self.grid_size, size= 2) #x,y przydziela 2 losowe liczby z grid_size
-            dE = -2 * self.calculate_energy(x, y)
+            x, y = self.rng.integers(0, self.grid_size, size= 2) #x,y przydziela 2 losowe liczby z grid_size
+            s = self.grid[x, y]
+            n = self.neighbors_sum(x, y)
+
+            if self.rng.random() < self.acceptance[(s + 1) // 2, (n + 4) // 2]:
+                self.grid[x, y] = -s
+                self.M -= 2 * s
+                self.bonds -= 2 * s * n
+
+    def step_checkerboard(self):
+        # jeden krok = dwa półkroki, po jednym na każdy kolor szachownicy
+        for mask in self.color_masks:
+            neighbors_sum = (np.roll(self.grid, 1, axis=0) + np.roll(self.grid, -1, axis=0) +
+                             np.roll(self.grid, 1, axis=1) + np.roll(self.grid, -1, axis=1))
+            spins = self.grid[mask]
+            neighbors = neighbors_sum[mask]
+            p = self.acceptance[(spins + 1) // 2, (neighbors + 4) // 2]
+            flip = self.rng.random(p.size) < p
+            self.grid[mask] = np.where(flip, -spins, spins)
+            # pola jednego koloru nie są sąsiadami, więc zmiany z każdego obrotu się sumują
+            self.M -= 2 * int(np.sum(spins[flip]))
+            self.bonds -= 2 * int(np.sum(spins[flip] * neighbors[flip]))
+
+    def reset_accumulators(self):
+        # pełna redukcja tylko raz, dalej kroki aktualizują M i sumę wiązań po każdym obrocie
+        self.M = int(np.sum(self.grid))
+        self.bonds = int(np.sum(self.grid * (np.roll(self.grid, 1, axis=0) + np.roll(self.grid, 1, axis=1))))
 
-            if dE < 0 or np.random.rand() < np.exp(-self.beta * dE):
-                self.grid[x, y] *= -1
+    def total_energy(self):
+        return -self.J * self.bonds - self.B * self.M
 
-    def run(self):
-        for step in track(range(self.steps), description="Simulating", transient=True):
+    def observables(self, burn_in=0):
+        m = np.asarray(self.magnetization[burn_in:])
+        e = np.asarray(self.energy[burn_in:])
+        n_spins = self.grid_size ** 2
+        return {
+            "magnetization": np.mean(m),
+            "abs_magnetization": np.mean(np.abs(m)),
+            "energy": np.mean(e),
+            "susceptibility": self.beta * n_spins * np.var(m),
+            "specific_heat": self.beta ** 2 * n_spins * np.var(e),
+        }
+
+    def run(self, beta_schedule=None):
+        self.reset_accumulators()
+        n_spins = self.grid_size ** 2
+        if self.filename_animation:
+            self.frame_writer = open_frame_writer(os.path.join(self.outputfolder, self.filename_animation), self.steps, self.grid_size,
+                                                  self.step_count, self.animation_offset)
+        if self.filename_prefix:
+            self.image_writer = start_image_writer()
+        for step in track(range(self.step_count, self.steps), description="Simulating", transient=True):
+            if beta_schedule is not None:
+                self.beta = beta_schedule(step)
             self.step()
-            magnetization = np.mean(self.grid)
-            self.magnetization.append(magnetization)
+            self.magnetization.append(self.M / n_spins)
+            self.energy.append(self.total_energy() / n_spins)
 
             if self.filename_prefix:
                 self.save_image(step)
 
             if self.filename_animation:
-                self.frames.append(self.grid.copy())
+                write_frame(self.frame_writer, self.grid)
+
+            self.step_count = step + 1
+            if self.filename_checkpoint and self.step_count % self.checkpoint_every == 0:
+                self.save_checkpoint()
+
+        if self.filename_checkpoint:
+            self.save_checkpoint()
         
         if self.filename_magnetization:
             self.save_magnetization()
 
         if self.filename_animation:
-            self.save_animation()
+            print("Saving animation")
+            close_frame_writer(self.frame_writer)
+
+        if self.filename_prefix:
+            stop_image_writer(self.image_writer)
+
+    # argumenty konstruktora zapisywane w checkpoincie obok siatki, generatora i szeregów czasowych
+    CHECKPOINT_PARAMS = ["grid_size", "J", "beta", "B", "steps", "spin_density", "filename_prefix", "filename_animation",
+                         "filename_magnetization", "outputfolder", "method", "image_scale", "filename_checkpoint", "checkpoint_every",
+                         "clusters"]
+
+    def save_checkpoint(self):
+        if self.filename_animation:
+            self.animation_offset = flush_frame_writer(self.frame_writer)
+
+        params = {name: getattr(self, name) for name in self.CHECKPOINT_PARAMS}
+        state = {"step_count": self.step_count, "animation_offset": self.animation_offset, "wolff_calibration": self.wolff_calibration}
+        save_npz(os.path.join(self.outputfolder, self.filename_checkpoint), grid=self.grid,
+                 magnetization=np.array(self.magnetization), energy=np.array(self.energy),
+                 params=json.dumps(params, default=lambda value: value.item()), state=json.dumps(state),
+                 rng_state=json.dumps(self.rng.bit_generator.state))
+
+    @classmethod
+    def load_checkpoint(cls, path):
+        # model.run() na wczytanym modelu kontynuuje dokładnie tak, jakby symulacja nie została przerwana
+        with np.load(path) as data:
+            model = cls(**json.loads(str(data["params"])))
+            for name, value in json.loads(str(data["state"])).items():
+                setattr(model, name, value)
+            model.grid = data["grid"]
+            model.reset_accumulators()
+            model.magnetization = data["magnetization"].tolist()
+            model.energy = data["energy"].tolist()
+            model.rng.bit_generator.state = json.loads(str(data["rng_state"]))
+        return model
 
     def save_image(self, step):
         self.file_path = os.path.join(self.outputfolder, self.filename_prefix)
-        plt.imshow(self.grid, cmap="coolwarm")
-        plt.title(f"Step {step}")
-        plt.savefig(f"{self.file_path}_{step}.png")
-        plt.close()
+        submit_image(self.image_writer, self.grid, f"{self.file_path}_{step}.png", self.image_scale)
 
     def save_magnetization(self):
         self.file_path = os.path.join(self.outputfolder, self.filename_magnetization)
         print("ścieżka", self.file_path)
         np.savetxt(self.file_path, self.magnetization)
 
-    def save_animation(self):
-        print("Saving animation")
-        fig, ax = plt.subplots()
-        def update(frame):
-            ax.clear()
-            ax.imshow(frame, cmap='coolwarm')
-
-        anim = FuncAnimation(fig, update, frames=self.frames, interval=100)
-        anim.save(os.path.join(self.outputfolder, self.filename_animation), writer='imagemagick')
-        plt.close()
-
 if __name__ == "__main__":
     model = ModelIsinga(
         grid_size=56,
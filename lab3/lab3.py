@@ -1,26 +1,208 @@
 import time
+import math
+import asyncio
+import inspect
+import functools
+import threading
+import itertools
+import os
+import csv
+import json
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import statistics
-
-# Dekorator do zliczania czasu wykonywania funkcji i obliczania statystyk
-def performance_tracker(func):
-    timings = []
-
-    def wrapper(*args, **kwargs):
-        start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        timings.append(time.perf_counter() - start_time)
-        return result
-
-    wrapper.get_stats = lambda: {
-        "count": len(timings),
-        "average": statistics.mean(timings) if timings else None,
-        "min": min(timings, default=None),
-        "max": max(timings, default=None),
-        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0
-    }
+from rich.console import Console
+from rich.table import Table
+
+# Histogram czasów: kubełki logarytmiczne od 1 ns do 1000 s, BUCKETS_PER_DECADE na dekadę
+# (percentyle z dokładnością ok. 6%), kubełek 0 i ostatni zbierają czasy spoza zakresu
+MIN_TIME = 1e-9
+BUCKETS_PER_DECADE = 20
+DECADES = 12
+BUCKETS = BUCKETS_PER_DECADE * DECADES + 2
+
+def bucket_index(elapsed):
+    if elapsed <= MIN_TIME:
+        return 0
+    return min(int(math.log10(elapsed / MIN_TIME) * BUCKETS_PER_DECADE) + 1, BUCKETS - 1)
+
+# Statystyki strumieniowe: pamięć O(1) niezależnie od liczby wywołań
+class TimingStats:
+    def __init__(self, sample=1):
+        # sample - mierzone jest co sample-te wywołanie (do szacowania łącznego czasu)
+        self.sample = sample
+        self.lock = threading.Lock()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets = [0] * BUCKETS
+
+    def add(self, elapsed):
+        index = bucket_index(elapsed)
+        with self.lock:
+            # algorytm Welforda - średnia i wariancja bez przechowywania pomiarów
+            self.count += 1
+            delta = elapsed - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (elapsed - self.mean)
+            self.min = min(self.min, elapsed)
+            self.max = max(self.max, elapsed)
+            self.buckets[index] += 1
+
+    def percentile(self, q, buckets, count):
+        # środek (geometryczny) kubełka, w którym skumulowana liczba pomiarów przekracza q * count
+        rank = q * count
+        cumulative = 0
+        for index, bucket in enumerate(buckets):
+            cumulative += bucket
+            if cumulative >= rank:
+                return MIN_TIME * 10 ** ((index - 0.5) / BUCKETS_PER_DECADE) if index else MIN_TIME
+        return None
+
+    def get_stats(self):
+        with self.lock:
+            count, mean, m2 = self.count, self.mean, self.m2
+            low, high, buckets = self.min, self.max, list(self.buckets)
+        if not count:
+            return {"count": 0, "average": None, "min": None, "max": None, "stdev": 0.0,
+                    "p50": None, "p95": None, "p99": None}
+        # percentyle obcięte do [min, max], bo środek kubełka może wyjść poza zakres pomiarów
+        return {
+            "count": count,
+            "average": mean,
+            "min": low,
+            "max": high,
+            "stdev": math.sqrt(m2 / (count - 1)) if count > 1 else 0.0,
+            "p50": min(max(self.percentile(0.50, buckets, count), low), high),
+            "p95": min(max(self.percentile(0.95, buckets, count), low), high),
+            "p99": min(max(self.percentile(0.99, buckets, count), low), high),
+        }
+
+# Globalny rejestr żyjących śledzonych funkcji: nazwa -> TimingStats
+REGISTRY = {}
+REGISTRY_LOCK = threading.Lock()
+STATS_FIELDS = ["name", "count", "sample", "total", "average", "min", "max", "stdev", "p50", "p95", "p99"]
+
+def register(name, stats, owner=None):
+    # ta sama nazwa (np. funkcje tworzone w fabryce mają wspólne __qualname__) dostaje kolejny numer
+    # zamiast nadpisać wpis poprzedniej funkcji
+    with REGISTRY_LOCK:
+        key = name
+        for number in itertools.count(2):
+            if key not in REGISTRY:
+                break
+            key = f"{name}#{number}"
+        REGISTRY[key] = stats
+    if owner is not None:
+        # wpis znika razem z funkcją (np. dekorowaną w pętli albo fabryce), więc rejestr nie rośnie bez końca;
+        # przy wyjściu z programu wpisy zostają dla końcowego raportu
+        weakref.finalize(owner, unregister, key, stats).atexit = False
+    return key
+
+def unregister(key, stats):
+    with REGISTRY_LOCK:
+        if REGISTRY.get(key) is stats:
+            del REGISTRY[key]
+
+# Dekorator do zliczania czasu wykonywania funkcji (także async) i obliczania statystyk,
+# użycie: @performance_tracker albo @performance_tracker(sample=N) - mierzone jest co N-te wywołanie
+def performance_tracker(func=None, *, sample=1, name=None):
+    if func is None:
+        return lambda func: performance_tracker(func, sample=sample, name=name)
+
+    stats = TimingStats(sample)
+    # next() na itertools.count jest atomowe w CPythonie, więc licznik nie potrzebuje blokady
+    calls = itertools.count()
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if sample > 1 and next(calls) % sample:
+                return await func(*args, **kwargs)
+            start_time = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                stats.add(time.perf_counter() - start_time)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if sample > 1 and next(calls) % sample:
+                return func(*args, **kwargs)
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.add(time.perf_counter() - start_time)
+
+    wrapper.get_stats = stats.get_stats
+    register(name or f"{func.__module__}.{func.__qualname__}", stats, wrapper)
     return wrapper
 
+# Migawka statystyk wszystkich funkcji; total to szacowany łączny czas (z uwzględnieniem próbkowania)
+def snapshot():
+    with REGISTRY_LOCK:
+        registered = list(REGISTRY.items())
+    result = {}
+    for name, stats in registered:
+        row = stats.get_stats()
+        row["sample"] = stats.sample
+        row["total"] = row["average"] * row["count"] * stats.sample if row["count"] else 0.0
+        result[name] = row
+    return result
+
+# Zapis migawki do .json lub .csv (po rozszerzeniu), atomowo - czytelnik nie zobaczy połowy pliku
+def dump(path):
+    rows = snapshot()
+    with open(path + ".tmp", "w", newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(file, fieldnames=STATS_FIELDS)
+            writer.writeheader()
+            for name, row in rows.items():
+                writer.writerow({"name": name, **row})
+        else:
+            json.dump(rows, file, indent=4)
+    os.replace(path + ".tmp", path)
+
+# Okresowy zapis w osobnym wątku, stop_dumper zapisuje jeszcze stan końcowy
+def start_dumper(path, interval=60.0):
+    stop = threading.Event()
+
+    def worker():
+        while not stop.wait(interval):
+            dump(path)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return {'path': path, 'stop': stop, 'thread': thread}
+
+def stop_dumper(dumper):
+    dumper['stop'].set()
+    dumper['thread'].join()
+    dump(dumper['path'])
+
+# Tabela Rich posortowana malejąco po łącznym czasie - najgorętsze funkcje na górze
+def report(console=None):
+    table = Table(title="Performance tracker")
+    table.add_column("Funkcja")
+    for column in ["count", "sample", "total", "average", "p50", "p95", "p99", "max"]:
+        table.add_column(column, justify="right")
+    rows = sorted(snapshot().items(), key=lambda item: item[1]["total"], reverse=True)
+    for name, row in rows:
+        table.add_row(name, str(row["count"]), str(row["sample"]),
+                      *(format_time(row[key]) for key in ["total", "average", "p50", "p95", "p99", "max"]))
+    (console or Console()).print(table)
+
+def format_time(seconds):
+    if seconds is None:
+        return "-"
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("µs", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
 # Funkcja testowa
 @performance_tracker
 def matrix_multiplication(size):
@@ -28,12 +210,27 @@ def matrix_multiplication(size):
     B = np.random.rand(size, size)
     return np.dot(A, B)
 
-# Testowanie kodu
-if __name__ == "__main__":
-    for _ in range(10):
-        matrix_multiplication(500)
+# Funkcja testowa async, mierzone co 10-te wywołanie
+@performance_tracker(sample=10)
+async def sleep_task(seconds):
+    await asyncio.sleep(seconds)
+
+async def run_sleep_tasks():
+    await asyncio.gather(*(sleep_task(0.01) for _ in range(100)))
 
-    stats = matrix_multiplication.get_stats()
-    print("Statystyki wykonania funkcji:")
+def print_stats(name, stats):
+    print(f"Statystyki wykonania funkcji {name}:")
     for key, value in stats.items():
         print(f"{key.capitalize()}: {value}")
+
+# Testowanie kodu
+if __name__ == "__main__":
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(matrix_multiplication, [500] * 10))
+    print_stats("matrix_multiplication", matrix_multiplication.get_stats())
+
+    asyncio.run(run_sleep_tasks())
+    print_stats("sleep_task", sleep_task.get_stats())
+
+    report()
+    dump("performance.json")
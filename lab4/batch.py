@@ -0,0 +1,57 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from rich.progress import track
+
+from lab4 import acceptance_table, initialize_model, run, step
+
+def warm_up():
+    # kompilacja Numby raz na proces roboczy, zanim dostanie pierwszą symulację
+    grid = np.ones((4, 4), dtype=np.int64)
+    step(grid, acceptance_table(1.0, 1.0, 0.0), 4, 0)
+
+def simulate(index, beta, B, grid_size, J, steps, spin_density, seed):
+    model = initialize_model(grid_size, J, beta, B, steps, spin_density=spin_density, seed=seed)
+    run(model, progress=False)
+    return index, model['magnetization'], model['energy']
+
+def run_batch(configs, J=1.0, steps=100, spin_density=0.5, max_workers=None, seed=None):
+    # każda konfiguracja (beta, B, grid_size, seed) w puli procesów
+    # konfiguracje z seed None dostają niezależne strumienie wyprowadzone z seed
+    # zwraca słownik z parametrami konfiguracji oraz tablicami (len(configs), steps) magnetyzacji i energii na spin
+    streams = np.random.SeedSequence(seed).spawn(len(configs))
+    magnetization = np.empty((len(configs), steps))
+    energy = np.empty((len(configs), steps))
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=warm_up) as executor:
+        futures = [
+            executor.submit(simulate, i, beta, B, grid_size, J, steps, spin_density,
+                            streams[i] if config_seed is None else config_seed)
+            for i, (beta, B, grid_size, config_seed) in enumerate(configs)
+        ]
+        for f in track(as_completed(futures), total=len(futures), description="Simulating", transient=True):
+            i, m, e = f.result()
+            magnetization[i] = m
+            energy[i] = e
+
+    return {
+        'beta': np.array([c[0] for c in configs]),
+        'B': np.array([c[1] for c in configs]),
+        'grid_size': np.array([c[2] for c in configs]),
+        'magnetization': magnetization,
+        'energy': energy,
+    }
+
+if __name__ == "__main__":
+    betas = np.linspace(0.2, 0.7, 26)
+    configs = [(beta, 0.0, 64, None) for beta in betas]
+
+    start = time.time()
+    results = run_batch(configs, steps=500, seed=2024)
+    print(f"{len(configs)} simulations on {os.cpu_count()} cores: {time.time() - start} seconds")
+
+    for beta, m, e in zip(results['beta'], results['magnetization'], results['energy']):
+        print(f"beta={beta:.3f}  |m|={np.mean(np.abs(m[100:])):.4f}  e={np.mean(e[100:]):.4f}")
+    np.savez("batch_results.npz", **results)
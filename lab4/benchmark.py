@@ -0,0 +1,165 @@
+import argparse
+import csv
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import time
+
+import numba
+import numpy as np
+from numba import get_num_threads, set_num_threads
+
+from lab4 import WOLFF_BURN_IN, acceptance_table, step, step_no_numba, step_parallel, step_wolff, wolff_sweep
+from multispin import REPLICAS, initialize_packed, quantized_acceptance, step_multispin
+
+# Harness porównujący backendy Isinga: czas jednego kroku (grid_size**2 prób obrotu) mierzony dekoratorem
+# performance_tracker z lab3, kompilacja i rozgrzewka poza pomiarem, wynik w próbach obrotu na sekundę z 95% CI
+# (dla Wolffa - w odwiedzonych polach na sekundę).
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+J, BETA, B = 1.0, 0.44, 0.0
+PRECISION = 16
+# backendy w czystym Pythonie są o rzędy wielkości wolniejsze, więc tylko dla małych siatek
+SLOW_MAX_SIZE = 128
+# kwantyle t-Studenta 0.975 dla małej liczby powtórzeń, powyżej 30 przybliżenie normalne
+T_95 = {1: 12.71, 2: 4.30, 3: 3.18, 4: 2.78, 5: 2.57, 6: 2.45, 7: 2.36, 8: 2.31, 9: 2.26,
+        10: 2.23, 15: 2.13, 20: 2.09, 30: 2.04}
+
+def load_module(name, path):
+    # lab3 leży obok, a lab2-final.py ma myślnik w nazwie - import po ścieżce pliku
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+lab3 = load_module("lab3", "../lab3/lab3.py")
+lab2 = load_module("lab2_final", "../lab2/lab2-final.py")
+
+def random_grid(grid_size, rng):
+    return rng.choice(np.array([-1, 1], dtype=np.int64), size=(grid_size, grid_size))
+
+# Każdy backend: grid_size, rng -> (funkcja wykonująca jeden krok, liczba prób obrotu na krok);
+# None - praca kroku jest zmienna i zwraca ją sama funkcja kroku
+def bench_step(grid_size, rng):
+    grid, acceptance, seeds = random_grid(grid_size, rng), acceptance_table(J, BETA, B), itertools.count()
+    return lambda: step(grid, acceptance, grid_size, next(seeds)), grid_size ** 2
+
+def bench_step_parallel(grid_size, rng):
+    grid, acceptance, seeds = random_grid(grid_size, rng), acceptance_table(J, BETA, B), itertools.count()
+    return lambda: step_parallel(grid, acceptance, grid_size, next(seeds)), grid_size ** 2
+
+def bench_step_wolff(grid_size, rng):
+    # rozgrzewka jak w lab4.run, potem stała liczba klastrów; praca kroku to pola odwiedzone przez klastry
+    grid, seeds, calibration = random_grid(grid_size, rng), itertools.count(), None
+    for _ in range(WOLFF_BURN_IN):
+        _, _, calibration = wolff_sweep(grid, J, BETA, B, rng, calibration=calibration)
+    return lambda: step_wolff(grid, J, BETA, B, grid_size, next(seeds), calibration['per_step'], 0)[2], None
+
+def bench_step_multispin(grid_size, rng):
+    packed = initialize_packed(grid_size, seed=rng)
+    acceptance_q, seeds = quantized_acceptance(J, BETA, B, PRECISION), itertools.count()
+    return lambda: step_multispin(packed, acceptance_q, grid_size, next(seeds), PRECISION), REPLICAS * grid_size ** 2
+
+def bench_step_no_numba(grid_size, rng):
+    grid, acceptance = random_grid(grid_size, rng), acceptance_table(J, BETA, B)
+    return lambda: step_no_numba(grid, acceptance, grid_size, rng), grid_size ** 2
+
+def bench_lab2(method):
+    def bench(grid_size, rng):
+        model = lab2.ModelIsinga(grid_size, J, BETA, B, 1, method=method, seed=rng)
+        return model.step, grid_size ** 2
+    return bench
+
+# nazwa -> (fabryka, czy wolny backend, czy zależy od liczby wątków); nowy kernel = nowy wpis
+BACKENDS = {
+    "step": (bench_step, False, False),
+    "step_parallel": (bench_step_parallel, False, True),
+    "step_wolff": (bench_step_wolff, False, False),
+    "step_multispin": (bench_step_multispin, False, False),
+    "step_no_numba": (bench_step_no_numba, True, False),
+    "ModelIsinga.step": (bench_lab2("sequential"), True, False),
+    "ModelIsinga.step_checkerboard": (bench_lab2("checkerboard"), False, False),
+}
+
+def t_quantile(df):
+    # najbliższy tabelaryczny df nie większy od danego - przedział raczej za szeroki niż za wąski
+    return T_95[max(k for k in T_95 if k <= df)] if df <= 30 else 1.96
+
+def time_sweeps(name, sweep, attempts, repetitions, warmup):
+    for _ in range(warmup):  # kompilacja i rozgrzewka pamięci podręcznej poza pomiarem
+        sweep()
+    timed = lab3.performance_tracker(sweep, name=name)
+    work = [timed() for _ in range(repetitions)]
+    if attempts is None:
+        attempts = sum(work) / repetitions
+    stats = timed.get_stats()
+    mean, count = stats["average"], stats["count"]
+    # przedział dla średniego czasu kroku przeniesiony na odwrotność - próby na sekundę
+    half = t_quantile(count - 1) * stats["stdev"] / np.sqrt(count) if count > 1 else 0.0
+    return {
+        "time_mean": mean,
+        "time_stdev": stats["stdev"],
+        "time_p50": stats["p50"],
+        "time_p95": stats["p95"],
+        "attempts_per_sweep": attempts,
+        "attempts_per_sec": attempts / mean,
+        "ci_low": attempts / (mean + half),
+        "ci_high": attempts / (mean - half) if mean > half else float("inf"),
+    }
+
+def run_benchmarks(backends, sizes, repetitions=20, warmup=2, thread_counts=None, seed=2024):
+    max_threads = get_num_threads()
+    thread_counts = thread_counts or [max_threads]
+    rng = np.random.default_rng(seed)
+    results = []
+    for grid_size in sizes:
+        for name in backends:
+            factory, slow, threaded = BACKENDS[name]
+            if slow and grid_size > SLOW_MAX_SIZE:
+                continue
+            for threads in (thread_counts if threaded else [max_threads]):
+                set_num_threads(threads)
+                sweep, attempts = factory(grid_size, rng)
+                row = {"backend": name, "grid_size": grid_size, "threads": threads, "repetitions": repetitions}
+                row.update(time_sweeps(f"{name} {grid_size} {threads}", sweep, attempts, repetitions, warmup))
+                results.append(row)
+                # praca kroku względem grid_size**2 - dla Wolffa sprawdza, czy krok obejmuje średnio całą siatkę
+                print(f"{name:32s} {grid_size:5d}x{grid_size:<5d} {threads:2d} thr  "
+                      f"{row['attempts_per_sec'] / 1e6:10.2f} M flips/s  "
+                      f"[{row['ci_low'] / 1e6:.2f}, {row['ci_high'] / 1e6:.2f}]  "
+                      f"{row['attempts_per_sweep'] / grid_size ** 2:6.2f} N/krok")
+    set_num_threads(max_threads)
+    return results
+
+def save_results(results, output):
+    # JSON z opisem środowiska do porównań między maszynami/wersjami, CSV do szybkiego wglądu
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {"J": J, "beta": BETA, "B": B, "precision": PRECISION},
+    }
+    with open(output + ".json", "w", encoding="utf-8") as file:
+        json.dump({"meta": meta, "results": results}, file, indent=4)
+    with open(output + ".csv", "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark Ising model backends')
+    parser.add_argument('--backends', '-b', nargs='+', choices=list(BACKENDS), default=list(BACKENDS), help='Backends to benchmark')
+    parser.add_argument('--sizes', '-s', nargs='+', type=int, default=[64, 256, 1024], help='Lattice sizes')
+    parser.add_argument('--repetitions', '-r', type=int, default=20, help='Timed sweeps per backend and size')
+    parser.add_argument('--warmup', '-w', type=int, default=2, help='Untimed sweeps before measuring (includes JIT compilation)')
+    parser.add_argument('--threads', '-t', nargs='+', type=int, help='Thread counts for parallel kernels')
+    parser.add_argument('--output', '-o', default='benchmark_results', help='Output path prefix for .json and .csv')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.backends, args.sizes, args.repetitions, args.warmup, args.threads)
+    save_results(results, args.output)
@@ -1,14 +1,29 @@
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from rich.progress import track
 import os
-from numba import jit
+import json
+import queue
+import threading
+from numba import float64, int8, int64, jit, prange, set_num_threads
 import time
 
-def initialize_model(grid_size, J, beta, B, steps, spin_density=0.5, filename_prefix=None, filename_animation=None, filename_magnetization=None, outputfolder=None):
+# PIL i rich są importowane dopiero w funkcjach, które ich potrzebują (obrazki, animacja, pasek postępu),
+# więc krótkie symulacje bez wyjścia graficznego nie płacą za ich import
+
+# jawne sygnatury dla obu typów siatki: kernele kompilują się przy imporcie, a dzięki cache=True
+# kolejne uruchomienia wczytują gotowy kod z __pycache__ zamiast kompilować od nowa
+GRID_TYPES = [int64[:, :], int8[:, :]]
+GRID_DTYPES = [np.dtype(np.int64), np.dtype(np.int8)]
+STEP_SIGNATURES = [(grid, float64[:, :], int64, int64) for grid in GRID_TYPES]
+WOLFF_SIGNATURES = [(grid, float64, float64, float64, int64, int64, int64, int64) for grid in GRID_TYPES]
+
+def initialize_model(grid_size, J, beta, B, steps, spin_density=0.5, filename_prefix=None, filename_animation=None, filename_magnetization=None, outputfolder=None, seed=None, dtype=np.int64, image_scale=1, filename_checkpoint=None, checkpoint_every=100):
+    # seed może być liczbą lub np.random.SeedSequence (niezależne strumienie dla wielu symulacji)
+    # filename_checkpoint: co checkpoint_every kroków zapisuje stan, z którego resume() kontynuuje symulację
+    # dtype=np.int8 zajmuje 8 razy mniej pamięci niż domyślne int64 (inne typy odpadają - kernele mają jawne sygnatury)
+    # image_scale=k zapisuje co k-ty spin w każdym kierunku na obrazkach kroków
+    if np.dtype(dtype) not in GRID_DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(str(grid_dtype) for grid_dtype in GRID_DTYPES)}, got {np.dtype(dtype)}")
+    rng = np.random.default_rng(seed)
     model = {
         'grid_size': grid_size,
         'J': J,
@@ -17,98 +32,432 @@ def initialize_model(grid_size, J, beta, B, steps, spin_density=0.5, filename_pr
         'steps': steps,
         'spin_density': spin_density,
         'filename_prefix': filename_prefix,
+        'image_scale': image_scale,
         'filename_animation': filename_animation,
         'filename_magnetization': filename_magnetization,
         'outputfolder': outputfolder,
-        'grid': np.random.choice([-1, 1], size=(grid_size, grid_size), p=[1 - spin_density, spin_density]),
+        'filename_checkpoint': filename_checkpoint,
+        'checkpoint_every': checkpoint_every,
+        'step': 0,
+        'rng': rng,
+        'grid': rng.choice(np.array([-1, 1], dtype=dtype), size=(grid_size, grid_size), p=[1 - spin_density, spin_density]),
         'magnetization': [],
-        'frames': []
+        'energy': []
     }
-    os.makedirs(outputfolder, exist_ok=True)
+    update_acceptance(model)
+    if outputfolder:
+        os.makedirs(outputfolder, exist_ok=True)
     return model
 
-@jit(nopython=True)
-def calculate_energy(grid, J, B, x, y, grid_size):
-    neighbors = [((x - 1) % grid_size, y), ((x + 1) % grid_size, y), 
-                 (x, (y - 1) % grid_size), (x, (y + 1) % grid_size)]
-    interaction_energy = - J * grid[x, y] * (
-        grid[neighbors[0][0], neighbors[0][1]] + grid[neighbors[1][0], neighbors[1][1]] +
-        grid[neighbors[2][0], neighbors[2][1]] + grid[neighbors[3][0], neighbors[3][1]])
-    field_energy = -B * grid[x, y]
-    return interaction_energy + field_energy
-
-@jit(nopython=True)
-def step(grid, J, beta, B, grid_size):
+def acceptance_table(J, beta, B):
+    # dE przy 4 sąsiadach przyjmuje tylko 10 wartości: wiersz (s + 1) // 2, kolumna (suma sąsiadów + 4) // 2
+    spins = np.array([-1, 1]).reshape(2, 1)
+    neighbors = np.arange(-4, 5, 2).reshape(1, 5)
+    dE = 2 * spins * (J * neighbors + B)
+    return np.minimum(1.0, np.exp(-beta * dE))
+
+def update_acceptance(model):
+    # przelicza tablicę tylko gdy beta lub B zmieniły się od ostatniego kroku (np. wyżarzanie)
+    key = (model['J'], model['beta'], model['B'])
+    if model.get('acceptance_key') != key:
+        model['acceptance'] = acceptance_table(*key)
+        model['acceptance_key'] = key
+    return model['acceptance']
+
+@jit(nopython=True, cache=True)
+def neighbors_sum(grid, x, y, grid_size):
+    return (grid[(x - 1) % grid_size, y] + grid[(x + 1) % grid_size, y] +
+            grid[x, (y - 1) % grid_size] + grid[x, (y + 1) % grid_size])
+
+def bonds_sum(grid):
+    # suma s_i * s_j po wszystkich parach sąsiadów (każda para raz)
+    return int(np.sum(grid * (np.roll(grid, 1, axis=0) + np.roll(grid, 1, axis=1))))
+
+def total_energy(model):
+    return -model['J'] * model['bonds'] - model['B'] * model['M']
+
+def reset_accumulators(model):
+    # pełna redukcja tylko raz, dalej kroki zwracają zmiany M i sumy wiązań po każdym obrocie
+    model['M'] = int(np.sum(model['grid']))
+    model['bonds'] = bonds_sum(model['grid'])
+
+@jit(STEP_SIGNATURES, nopython=True, cache=True)
+def step(grid, acceptance, grid_size, seed):
+    # generator Numby jest osobny od numpy, więc każdy krok dostaje ziarno z model['rng']
+    np.random.seed(seed)
+    dM = 0
+    dbonds = 0
     for _ in range(grid_size ** 2):
         x, y = np.random.randint(0, grid_size, size=2)
-        dE = -2 * calculate_energy(grid, J, B, x, y, grid_size)
+        s = grid[x, y]
+        n = neighbors_sum(grid, x, y, grid_size)
+
+        if np.random.rand() < acceptance[(s + 1) // 2, (n + 4) // 2]:
+            grid[x, y] = -s
+            dM -= 2 * s
+            dbonds -= 2 * s * n
+    return dM, dbonds
+
+@jit(nopython=True, cache=True)
+def mix64(z):
+    # finalizer splitmix64 - z kolejnych liczb robi niezależnie wyglądające 64-bitowe wartości
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+@jit(nopython=True, cache=True)
+def next_uint64(state):
+    # splitmix64: stan to zwykła liczba, więc każdy wątek może mieć własny strumień
+    state = state + np.uint64(0x9E3779B97F4A7C15)
+    return state, mix64(state)
+
+@jit(nopython=True, cache=True)
+def next_uniform(state):
+    state, z = next_uint64(state)
+    return state, (z >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+
+# bez jawnych sygnatur: kompilacja przy imporcie uruchamia warstwę wątków Numby, która nie przeżywa fork()
+# (ProcessPoolExecutor w batch.py) - jądro równoległe kompiluje się (lub wczytuje z cache) przy pierwszym użyciu
+@jit(nopython=True, parallel=True, cache=True)
+def step_parallel(grid, acceptance, grid_size, seed):
+    # szachownica: wiersze jednego koloru dzielone między wątki, każdy wiersz ma własny strumień
+    # liczb losowych zależny tylko od (seed, kolor, wiersz), więc wynik nie zależy od liczby wątków
+    dM = np.zeros(grid_size, dtype=np.int64)
+    dbonds = np.zeros(grid_size, dtype=np.int64)
+    for color in range(2):
+        for x in prange(grid_size):
+            state = mix64(np.uint64(seed) + mix64(np.uint64(2 * x + color + 1)))
+            for y in range((x + color) % 2, grid_size, 2):
+                s = grid[x, y]
+                n = neighbors_sum(grid, x, y, grid_size)
+                state, u = next_uniform(state)
+
+                if u < acceptance[(s + 1) // 2, (n + 4) // 2]:
+                    grid[x, y] = -s
+                    dM[x] -= 2 * s
+                    dbonds[x] -= 2 * s * n
+    return dM.sum(), dbonds.sum()
+
+@jit(WOLFF_SIGNATURES, nopython=True, cache=True)
+def step_wolff(grid, J, beta, B, grid_size, seed, clusters, min_visited):
+    # klastry Wolffa (dla J > 0): co najmniej clusters klastrów, a dalej, aż obejmą min_visited pól - zatrzymanie
+    # po łącznym rozmiarze zależy od stanu i przesuwa pomiary, więc tylko w rozgrzewce (patrz wolff_sweep)
+    # przy B != 0 pole to "duch" - dodatkowy spin o znaku B połączony z każdym polem o sile |B|; spin zgodny z polem
+    # łączy się z duchem z prawdopodobieństwem 1 - exp(-2 beta |B|), a klaster połączony z duchem nie jest obracany
+    # (daje to dokładnie akceptację min(1, exp(-beta * dE_pola)), a budowę takiego klastra można przerwać od razu)
+    np.random.seed(seed)
+    n_spins = grid_size ** 2
+    p_add = 1.0 - np.exp(-2.0 * beta * J)
+    p_ghost = 1.0 - np.exp(-2.0 * beta * abs(B))
+    ghost = 1 if B > 0 else -1
+    in_cluster = np.zeros((grid_size, grid_size), dtype=np.bool_)
+    # jawna lista pól klastra służy też za kolejkę do odwiedzenia - bez rekurencji
+    cluster = np.empty(n_spins, dtype=np.int32)
+    dM = 0
+    dbonds = 0
+    visited = 0
+    done = 0
+    while done < clusters or visited < min_visited:
+        x, y = np.random.randint(0, grid_size, size=2)
+        s = grid[x, y]
+        in_cluster[x, y] = True
+        cluster[0] = x * grid_size + y
+        size = 1
+        head = 0
+        flip = True
+        while head < size:
+            x, y = divmod(cluster[head], grid_size)
+            head += 1
+            if s == ghost and B != 0 and np.random.rand() < p_ghost:
+                flip = False
+                break
+            for nx, ny in ((x - 1) % grid_size, y), ((x + 1) % grid_size, y), (x, (y - 1) % grid_size), (x, (y + 1) % grid_size):
+                if not in_cluster[nx, ny] and grid[nx, ny] == s and np.random.rand() < p_add:
+                    in_cluster[nx, ny] = True
+                    cluster[size] = nx * grid_size + ny
+                    size += 1
+
+        if flip:
+            # suma spinów spoza klastra przy jego brzegu - tylko te wiązania zmieniają się przy obrocie
+            boundary = 0
+            for i in range(size):
+                x, y = divmod(cluster[i], grid_size)
+                for nx, ny in ((x - 1) % grid_size, y), ((x + 1) % grid_size, y), (x, (y - 1) % grid_size), (x, (y + 1) % grid_size):
+                    if not in_cluster[nx, ny]:
+                        boundary += grid[nx, ny]
+            dM -= 2 * s * size
+            dbonds -= 2 * s * boundary
 
-        if dE < 0 or np.random.rand() < np.exp(-beta * dE):
-            grid[x, y] *= -1
+        for i in range(size):
+            x, y = divmod(cluster[i], grid_size)
+            in_cluster[x, y] = False
+            if flip:
+                grid[x, y] = -s
+        visited += size
+        done += 1
+    return dM, dbonds, visited, done
 
-def run(model, use_numba=True):
+# kroki rozgrzewki Wolffa (na początku i po zmianie beta o więcej niż WOLFF_BETA_TOLERANCE)
+WOLFF_BURN_IN = 40
+WOLFF_BETA_TOLERANCE = 0.05
+
+def wolff_sweep(grid, J, beta, B, rng, clusters=None, calibration=None):
+    # clusters=None: liczba klastrów dobierana w rozgrzewce tak, by w równowadze krok obejmował średnio grid_size**2 pól;
+    # przez 3/4 rozgrzewki krok to klastry aż do grid_size**2 odwiedzonych pól (koszt jak krok Metropolisa także
+    # przed uporządkowaniem siatki), z jej drugiej połowy wstępna liczba klastrów, ostatnia ćwierć już ze stałą liczbą
+    # i z niej średni rozmiar klastra (zatrzymanie po rozmiarze zawyża go przez ostatni, przeważnie duży klaster);
+    # po rozgrzewce liczba się nie zmienia, więc nie przesuwa pomiarów (observables z burn_in >= WOLFF_BURN_IN)
+    # calibration - stan doboru zwracany do zapamiętania i zapisania w checkpoincie
+    grid_size = grid.shape[0]
+    n_spins = grid_size ** 2
+    calibrating = clusters is None
+    min_visited = 0
+    if calibrating:
+        if calibration is None or abs(beta - calibration['beta']) > WOLFF_BETA_TOLERANCE * calibration['beta']:
+            calibration = {'beta': beta, 'steps': 0, 'per_step': None, 'clusters': 0, 'visited': 0}
+        if calibration['per_step'] is None:
+            clusters, min_visited = 1, n_spins
+        else:
+            clusters = calibration['per_step']
+    dM, dbonds, visited, done = step_wolff(grid, J, beta, B, grid_size, rng.integers(2**32), clusters, min_visited)
+    if calibrating and calibration['steps'] < WOLFF_BURN_IN:
+        calibration['steps'] += 1
+        if calibration['steps'] > WOLFF_BURN_IN // 2:
+            calibration['clusters'] += done
+            calibration['visited'] += visited
+        if calibration['steps'] in (3 * WOLFF_BURN_IN // 4, WOLFF_BURN_IN):
+            calibration['per_step'] = max(1, round(n_spins * calibration['clusters'] / calibration['visited']))
+            calibration['clusters'] = calibration['visited'] = 0
+    return dM, dbonds, calibration
+
+def run(model, use_numba=True, beta_schedule=None, progress=True, method="sequential", threads=None, clusters=None):
+    # method: "sequential" (losowe pola, Numba lub czysty Python), "parallel" (szachownica na wielu wątkach)
+    # albo "wolff" (klastry Wolffa, clusters klastrów na krok - domyślnie dobierane w rozgrzewce przez wolff_sweep)
+    if method == "parallel" and model['grid_size'] % 2:
+        raise ValueError("parallel method requires an even grid_size")
+    if threads is not None:
+        set_num_threads(threads)
     start_time = time.time()
-    for step_num in track(range(model['steps']), description="Simulating", transient=True):
-        if use_numba:
-            step(model['grid'], model['J'], model['beta'], model['B'], model['grid_size'])
+    model['run_options'] = {'use_numba': use_numba, 'method': method, 'clusters': clusters}
+    reset_accumulators(model)
+    n_spins = model['grid_size'] ** 2
+    steps = range(model['step'], model['steps'])
+    if progress:
+        from rich.progress import track
+        steps = track(steps, description="Simulating", transient=True)
+    frame_writer = open_frame_writer(os.path.join(model['outputfolder'], model['filename_animation']), model['steps'], model['grid_size'],
+                                     model['step'], model.get('animation_offset', 0)) if model['filename_animation'] else None
+    image_writer = start_image_writer() if model['filename_prefix'] else None
+    for step_num in steps:
+        if beta_schedule is not None:
+            model['beta'] = beta_schedule(step_num)
+        acceptance = update_acceptance(model)
+        if method == "parallel":
+            dM, dbonds = step_parallel(model['grid'], acceptance, model['grid_size'], model['rng'].integers(2**32))
+        elif method == "wolff":
+            dM, dbonds, model['wolff_calibration'] = wolff_sweep(model['grid'], model['J'], model['beta'], model['B'], model['rng'],
+                                                                 clusters, model.get('wolff_calibration'))
+        elif use_numba:
+            dM, dbonds = step(model['grid'], acceptance, model['grid_size'], model['rng'].integers(2**32))
         else:
-            step_no_numba(model['grid'], model['J'], model['beta'], model['B'], model['grid_size'])
-        magnetization = np.mean(model['grid'])
-        model['magnetization'].append(magnetization)
+            dM, dbonds = step_no_numba(model['grid'], acceptance, model['grid_size'], model['rng'])
+        model['M'] += dM
+        model['bonds'] += dbonds
+        model['magnetization'].append(model['M'] / n_spins)
+        model['energy'].append(total_energy(model) / n_spins)
 
-        if model['filename_prefix']:
-            save_image(model, step_num)
+        if image_writer:
+            save_image(model, step_num, image_writer)
 
-        if model['filename_animation']:
-            model['frames'].append(model['grid'].copy())
+        if frame_writer:
+            write_frame(frame_writer, model['grid'])
+
+        model['step'] = step_num + 1
+        if model['filename_checkpoint'] and model['step'] % model['checkpoint_every'] == 0:
+            save_checkpoint(model, frame_writer)
     
+    if model['filename_checkpoint']:
+        save_checkpoint(model, frame_writer)
+
     if model['filename_magnetization']:
         save_magnetization(model)
 
-    if model['filename_animation']:
-        save_animation(model)
+    if frame_writer:
+        close_frame_writer(frame_writer)
+
+    if image_writer:
+        stop_image_writer(image_writer)
     end_time = time.time()
     return end_time - start_time
 
-def step_no_numba(grid, J, beta, B, grid_size):
+# parametry modelu zapisywane w checkpoincie obok siatki, generatora i szeregów czasowych
+CHECKPOINT_KEYS = ['grid_size', 'J', 'beta', 'B', 'steps', 'spin_density', 'filename_prefix', 'image_scale',
+                   'filename_animation', 'filename_magnetization', 'outputfolder', 'filename_checkpoint',
+                   'checkpoint_every', 'step', 'animation_offset', 'run_options', 'wolff_calibration']
+
+def save_checkpoint(model, frame_writer=None):
+    if frame_writer:
+        model['animation_offset'] = flush_frame_writer(frame_writer)
+
+    params = {key: model[key] for key in CHECKPOINT_KEYS if key in model}
+    save_npz(os.path.join(model['outputfolder'], model['filename_checkpoint']), grid=model['grid'],
+             magnetization=np.array(model['magnetization']), energy=np.array(model['energy']),
+             params=json.dumps(params, default=lambda value: value.item()),
+             rng_state=json.dumps(model['rng'].bit_generator.state))
+
+def save_npz(path, **arrays):
+    # zapis do pliku tymczasowego i podmiana - przerwany zapis nie psuje poprzedniego checkpointu
+    with open(path + '.tmp', 'wb') as file:
+        np.savez(file, **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + '.tmp', path)
+
+def load_checkpoint(path):
+    with np.load(path) as data:
+        model = json.loads(str(data['params']))
+        model['grid'] = data['grid']
+        model['magnetization'] = data['magnetization'].tolist()
+        model['energy'] = data['energy'].tolist()
+        model['rng'] = np.random.default_rng()
+        model['rng'].bit_generator.state = json.loads(str(data['rng_state']))
+    update_acceptance(model)
+    return model
+
+def resume(path, beta_schedule=None, progress=True, threads=None):
+    # kontynuuje dokładnie tak, jakby symulacja nie została przerwana (ta sama metoda i harmonogram beta)
+    model = load_checkpoint(path)
+    options = model.get('run_options', {})
+    run(model, beta_schedule=beta_schedule, progress=progress, threads=threads, **options)
+    return model
+
+def step_no_numba(grid, acceptance, grid_size, rng):
+    dM = 0
+    dbonds = 0
     for _ in range(grid_size ** 2):
-        x, y = np.random.randint(0, grid_size, size=2)
-        dE = -2 * calculate_energy_no_numba(grid, J, B, x, y, grid_size)
+        x, y = rng.integers(0, grid_size, size=2)
+        s = int(grid[x, y])
+        n = neighbors_sum_no_numba(grid, x, y, grid_size)
+
+        if rng.random() < acceptance[(s + 1) // 2, (n + 4) // 2]:
+            grid[x, y] = -s
+            dM -= 2 * s
+            dbonds -= 2 * s * n
+    return dM, dbonds
 
-        if dE < 0 or np.random.rand() < np.exp(-beta * dE):
-            grid[x, y] *= -1
+def neighbors_sum_no_numba(grid, x, y, grid_size):
+    # int(), żeby sumy z siatki int8 nie przepełniły się przy liczeniu zmian
+    return int(grid[(x - 1) % grid_size, y] + grid[(x + 1) % grid_size, y] +
+               grid[x, (y - 1) % grid_size] + grid[x, (y + 1) % grid_size])
 
-def calculate_energy_no_numba(grid, J, B, x, y, grid_size):
-    neighbors = [((x - 1) % grid_size, y), ((x + 1) % grid_size, y), 
-                 (x, (y - 1) % grid_size), (x, (y + 1) % grid_size)]
-    interaction_energy = - J * grid[x, y] * (
-        grid[neighbors[0][0], neighbors[0][1]] + grid[neighbors[1][0], neighbors[1][1]] +
-        grid[neighbors[2][0], neighbors[2][1]] + grid[neighbors[3][0], neighbors[3][1]])
-    field_energy = -B * grid[x, y]
-    return interaction_energy + field_energy
+def observables(model, burn_in=0):
+    # estymatory z szeregów czasowych po odrzuceniu pierwszych burn_in kroków (dla bieżącej beta)
+    m = np.asarray(model['magnetization'][burn_in:])
+    e = np.asarray(model['energy'][burn_in:])
+    n_spins = model['grid_size'] ** 2
+    return {
+        'magnetization': np.mean(m),
+        'abs_magnetization': np.mean(np.abs(m)),
+        'energy': np.mean(e),
+        'susceptibility': model['beta'] * n_spins * np.var(m),
+        'specific_heat': model['beta'] ** 2 * n_spins * np.var(e),
+    }
+
+def start_image_writer(max_pending=16):
+    # kodowanie PNG w osobnym wątku, pełna kolejka spowalnia symulację zamiast zjadać pamięć
+    # błąd zapisu zostaje w writer['error'] i jest zgłaszany w wątku symulacji (submit_image, stop_image_writer);
+    # po błędzie wątek już nic nie zapisuje, ale dalej opróżnia kolejkę, żeby put nie czekał w nieskończoność
+    writer = {'queue': queue.Queue(maxsize=max_pending), 'error': None}
+
+    def worker():
+        while (item := writer['queue'].get()) is not None:
+            if writer['error'] is not None:
+                continue
+            grid, path = item
+            try:
+                spin_image(grid).save(path, optimize=False, compress_level=1)
+            except Exception as error:
+                writer['error'] = error
 
-def save_image(model, step):
+    writer['thread'] = threading.Thread(target=worker, daemon=True)
+    writer['thread'].start()
+    return writer
+
+def stop_image_writer(writer):
+    writer['queue'].put(None)
+    writer['thread'].join()
+    if writer['error'] is not None:
+        raise writer['error']
+
+def save_image(model, step, writer):
     file_path = os.path.join(model['outputfolder'], model['filename_prefix'])
-    plt.imshow(model['grid'], cmap="coolwarm")
-    plt.title(f"Step {step}")
-    plt.savefig(f"{file_path}_{step}.png")
-    plt.close()
+    submit_image(writer, model['grid'], f"{file_path}_{step}.png", model['image_scale'])
+
+def submit_image(writer, grid, path, scale=1):
+    if writer['error'] is not None:
+        raise writer['error']
+    # kopia, bo symulacja zmienia siatkę, zanim wątek zapisze obrazek
+    writer['queue'].put((grid[::scale, ::scale].copy(), path))
 
 def save_magnetization(model):
     file_path = os.path.join(model['outputfolder'], model['filename_magnetization'])
     print("ścieżka", file_path)
     np.savetxt(file_path, model['magnetization'])
 
-def save_animation(model):
-    print("Saving animation")
-    fig, ax = plt.subplots()
-    def update(frame):
-        ax.clear()
-        ax.imshow(frame, cmap='coolwarm')
+# krańce mapy coolwarm: -1 niebieski, +1 czerwony
+SPIN_PALETTE = [59, 76, 192, 180, 4, 38]
+
+def spin_image(grid):
+    from PIL import Image
+    image = Image.fromarray(((grid + 1) // 2).astype(np.uint8))
+    image.putpalette(SPIN_PALETTE)
+    return image
+
+def open_frame_writer(path, steps, grid_size, step=0, offset=0):
+    # klatki od razu trafiają do pliku, więc pamięć nie rośnie z liczbą kroków:
+    # .npy - surowe spiny int8 w pliku mapowanym w pamięć, inaczej GIF kodowany klatka po klatce
+    # po wznowieniu z checkpointu (step > 0) dopisuje do istniejącego pliku od miejsca offset zapisanego w checkpoincie
+    resumed = step > 0
+    if path.endswith('.npy'):
+        if resumed:
+            frames = np.lib.format.open_memmap(path, mode='r+')
+        else:
+            frames = np.lib.format.open_memmap(path, mode='w+', dtype=np.int8, shape=(steps, grid_size, grid_size))
+        return {'frames': frames, 'count': step}
+    if resumed:
+        file = open(path, 'r+b')
+        file.truncate(offset)
+        file.seek(offset)
+    else:
+        file = open(path, 'wb')
+    return {'file': file, 'count': step}
+
+def write_frame(writer, grid):
+    if 'frames' in writer:
+        writer['frames'][writer['count']] = grid
+    else:
+        from PIL import GifImagePlugin
+        image = spin_image(grid)
+        if writer['count'] == 0:
+            header, _ = GifImagePlugin.getheader(image, info={'loop': 0, 'optimize': False})
+            writer['file'].write(b''.join(header))
+        writer['file'].write(b''.join(GifImagePlugin.getdata(image, duration=100)))
+    writer['count'] += 1
+
+def flush_frame_writer(writer):
+    # klatki na dysk przed checkpointem; zwraca miejsce w pliku GIF, od którego wznowienie dopisuje klatki
+    if 'frames' in writer:
+        writer['frames'].flush()
+        return 0
+    writer['file'].flush()
+    return writer['file'].tell()
 
-    anim = FuncAnimation(fig, update, frames=model['frames'], interval=100)
-    anim.save(os.path.join(model['outputfolder'], model['filename_animation']), writer='imagemagick')
-    plt.close()
+def close_frame_writer(writer):
+    if 'frames' in writer:
+        writer['frames'].flush()
+    else:
+        writer['file'].write(b';')  # koniec pliku GIF
+        writer['file'].close()
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+import numpy as np
+from numba import jit
+
+from lab4 import acceptance_table, mix64, next_uint64
+
+# Multispin coding: bit b słowa uint64 w polu (x, y) to spin repliki b (1 = +1, 0 = -1).
+# Jedna siatka uint64 trzyma 64 niezależne repliki - 1 bit na spin zamiast 64 bitów w int64.
+
+REPLICAS = 64
+
+def initialize_packed(grid_size, spin_density=0.5, seed=None):
+    rng = np.random.default_rng(seed)
+    if spin_density == 0.5:
+        return rng.integers(0, 2**64, size=(grid_size, grid_size), dtype=np.uint64)
+    # wiersz po wierszu, żeby nie tworzyć tablicy 64 * grid_size**2 liczb naraz
+    packed = np.zeros((grid_size, grid_size), dtype=np.uint64)
+    weights = np.left_shift(np.uint64(1), np.arange(REPLICAS, dtype=np.uint64))
+    for x in range(grid_size):
+        bits = rng.random((grid_size, REPLICAS)) < spin_density
+        packed[x] = np.bitwise_or.reduce(np.where(bits, weights, np.uint64(0)), axis=1)
+    return packed
+
+def pack(grids):
+    # lista do 64 siatek ±1 -> jedna siatka uint64
+    packed = np.zeros(np.shape(grids[0]), dtype=np.uint64)
+    for b, grid in enumerate(grids):
+        packed |= (np.asarray(grid) > 0).astype(np.uint64) << np.uint64(b)
+    return packed
+
+def unpack(packed, replica):
+    return np.where((packed >> np.uint64(replica)) & np.uint64(1), 1, -1).astype(np.int8)
+
+def quantized_acceptance(J, beta, B, precision):
+    # prawdopodobieństwa jako liczby całkowite q / 2**precision dla bitowego losowania
+    return np.round(acceptance_table(J, beta, B) * 2**precision).astype(np.int64)
+
+@jit(nopython=True, cache=True)
+def bernoulli_word(state, q, precision):
+    # słowo, w którym każdy bit niezależnie jest 1 z prawdopodobieństwem q / 2**precision:
+    # kolejne bity q od najmłodszego - 1 to OR z losowym słowem (p -> (1 + p) / 2), 0 to AND (p -> p / 2)
+    word = np.uint64(0)
+    for i in range(precision):
+        state, r = next_uint64(state)
+        if (q >> i) & 1:
+            word |= r
+        else:
+            word &= r
+    return state, word
+
+@jit(nopython=True, cache=True)
+def step_multispin(packed, acceptance_q, grid_size, seed, precision):
+    # krok Metropolisa po kolei po polach, dla wszystkich 64 replik jednocześnie
+    state = mix64(np.uint64(seed))
+    full = 1 << precision
+    for x in range(grid_size):
+        for y in range(grid_size):
+            s = packed[x, y]
+            # bity różne od sąsiadów (sąsiad przeciwny), zliczane sumatorem bitowym do b2 b1 b0
+            a = s ^ packed[(x - 1) % grid_size, y]
+            b = s ^ packed[(x + 1) % grid_size, y]
+            c = s ^ packed[x, (y - 1) % grid_size]
+            d = s ^ packed[x, (y + 1) % grid_size]
+            s_ab = a ^ b
+            s_cd = c ^ d
+            c_ab = a & b
+            c_cd = c & d
+            carry = s_ab & s_cd
+            b0 = s_ab ^ s_cd
+            b1 = c_ab ^ c_cd ^ carry
+            b2 = (c_ab & c_cd) | (carry & (c_ab ^ c_cd))
+
+            flip = np.uint64(0)
+            for m in range(5):
+                mask = (b0 if m & 1 else ~b0) & (b1 if m & 2 else ~b1) & (b2 if m & 4 else ~b2)
+                if mask == 0:
+                    continue
+                for spin in (-1, 1):
+                    cls = mask & (s if spin == 1 else ~s)
+                    if cls == 0:
+                        continue
+                    # m sąsiadów przeciwnych, więc suma sąsiadów = spin * (4 - 2m)
+                    q = acceptance_q[(spin + 1) // 2, (spin * (4 - 2 * m) + 4) // 2]
+                    if q >= full:
+                        flip |= cls
+                    elif q > 0:
+                        state, word = bernoulli_word(state, q, precision)
+                        flip |= cls & word
+            packed[x, y] = s ^ flip
+
+@jit(nopython=True, cache=True)
+def replica_sums(packed, grid_size):
+    # M i suma wiązań dla każdej repliki osobno
+    M = np.zeros(64, dtype=np.int64)
+    bonds = np.zeros(64, dtype=np.int64)
+    for x in range(grid_size):
+        for y in range(grid_size):
+            s = packed[x, y]
+            right = s ^ packed[x, (y + 1) % grid_size]
+            down = s ^ packed[(x + 1) % grid_size, y]
+            for b in range(64):
+                bit = np.uint64(b)
+                M[b] += 2 * np.int64((s >> bit) & np.uint64(1)) - 1
+                bonds[b] += 2 - 2 * np.int64((right >> bit) & np.uint64(1)) - 2 * np.int64((down >> bit) & np.uint64(1))
+    return M, bonds
+
+def run_multispin(grid_size, J, beta, B, steps, spin_density=0.5, precision=16, seed=None, measure_every=1):
+    # 64 niezależne repliki upakowane w jedną siatkę uint64
+    # zwraca magnetyzację i energię na spin każdej repliki, kształt (steps // measure_every, 64)
+    rng = np.random.default_rng(seed)
+    packed = initialize_packed(grid_size, spin_density, rng)
+    acceptance_q = quantized_acceptance(J, beta, B, precision)
+    n_spins = grid_size ** 2
+    magnetization = []
+    energy = []
+    for step_num in range(steps):
+        step_multispin(packed, acceptance_q, grid_size, rng.integers(2**32), precision)
+        if (step_num + 1) % measure_every == 0:
+            M, bonds = replica_sums(packed, grid_size)
+            magnetization.append(M / n_spins)
+            energy.append((-J * bonds - B * M) / n_spins)
+    return {'packed': packed, 'magnetization': np.array(magnetization), 'energy': np.array(energy)}
+
+if __name__ == "__main__":
+    results = run_multispin(grid_size=64, J=1.0, beta=0.44, B=0.0, steps=1000, seed=2024, measure_every=10)
+    m = np.abs(results['magnetization'][20:]).mean(axis=0)
+    print(f"|m| per replica: mean {m.mean():.4f}, spread {m.std():.4f}")
+    print(f"lattice memory: {results['packed'].nbytes} bytes for 64 replicas (int64 grids: {64 * 8 * 64**2} bytes)")
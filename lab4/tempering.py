@@ -0,0 +1,67 @@
+import numpy as np
+from rich.progress import track
+
+from lab4 import acceptance_table, bonds_sum, step, step_parallel
+
+def run_tempering(grid_size, J, betas, B, steps, swap_interval=1, spin_density=0.5, seed=None, method="sequential", progress=True):
+    # parallel tempering: jedna replika na każdą beta, sąsiednie beta wymieniają się konfiguracjami
+    # zwraca szeregi czasowe magnetyzacji i energii na spin dla każdej beta (kształt (steps, len(betas)))
+    # oraz częstość akceptacji wymian dla każdej pary sąsiednich beta
+    if method == "parallel" and grid_size % 2:
+        # przy nieparzystym rozmiarze pola jednego koloru sąsiadują przez brzeg okresowy
+        raise ValueError("parallel method requires an even grid_size")
+    rng = np.random.default_rng(seed)
+    kernel = step_parallel if method == "parallel" else step
+    n_replicas = len(betas)
+    n_spins = grid_size ** 2
+
+    grids = [rng.choice(np.array([-1, 1], dtype=np.int64), size=(grid_size, grid_size), p=[1 - spin_density, spin_density]) for _ in range(n_replicas)]
+    tables = [acceptance_table(J, beta, B) for beta in betas]
+    M = np.array([np.sum(grid) for grid in grids])
+    bonds = np.array([bonds_sum(grid) for grid in grids])
+    # order[k] = numer repliki, która aktualnie jest w temperaturze betas[k]
+    order = np.arange(n_replicas)
+
+    magnetization = np.empty((steps, n_replicas))
+    energy = np.empty((steps, n_replicas))
+    attempts = np.zeros(n_replicas - 1, dtype=np.int64)
+    accepted = np.zeros(n_replicas - 1, dtype=np.int64)
+
+    steps_range = range(steps)
+    if progress:
+        steps_range = track(steps_range, description="Tempering", transient=True)
+    for step_num in steps_range:
+        for k in range(n_replicas):
+            r = order[k]
+            dM, dbonds = kernel(grids[r], tables[k], grid_size, rng.integers(2**32))
+            M[r] += dM
+            bonds[r] += dbonds
+
+        E = -J * bonds - B * M
+        if (step_num + 1) % swap_interval == 0:
+            # naprzemiennie pary (0,1),(2,3),... i (1,2),(3,4),...
+            for k in range((step_num // swap_interval) % 2, n_replicas - 1, 2):
+                r1, r2 = order[k], order[k + 1]
+                attempts[k] += 1
+                if rng.random() < np.exp((betas[k] - betas[k + 1]) * (E[r1] - E[r2])):
+                    order[k], order[k + 1] = r2, r1
+                    accepted[k] += 1
+
+        magnetization[step_num] = M[order] / n_spins
+        energy[step_num] = E[order] / n_spins
+
+    return {
+        'beta': np.asarray(betas),
+        'magnetization': magnetization,
+        'energy': energy,
+        'swap_acceptance': accepted / np.maximum(attempts, 1),
+    }
+
+if __name__ == "__main__":
+    betas = np.linspace(0.38, 0.50, 8)
+    results = run_tempering(grid_size=64, J=1.0, betas=betas, B=0.0, steps=2000, seed=2024)
+
+    for beta, m, e in zip(results['beta'], results['magnetization'].T, results['energy'].T):
+        print(f"beta={beta:.3f}  |m|={np.mean(np.abs(m[500:])):.4f}  e={np.mean(e[500:]):.4f}")
+    for k, rate in enumerate(results['swap_acceptance']):
+        print(f"swap {betas[k]:.3f} <-> {betas[k + 1]:.3f}: {rate:.2%}")
@@ -0,0 +1,47 @@
+import argparse
+import os
+import time
+import tracemalloc
+
+from fetch import fetch, make_session
+from lab5 import PARSER, parse_champions, parse_champions_targeted, url
+
+# Porównanie parsowania całego dokumentu (parse_champions) z parsowaniem tylko tabel (parse_champions_targeted)
+# na zapisanej kopii strony: najlepszy czas z kilku powtórzeń i szczyt pamięci zmierzony tracemalloc.
+
+def load_page(path):
+    # zapisana kopia strony - pobierana tylko za pierwszym razem
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(fetch(make_session(), url).text)
+    with open(path, encoding='utf-8') as file:
+        return file.read()
+
+def measure(parse, html, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(html)
+        times.append(time.perf_counter() - start)
+    # pamięć osobno, bo tracemalloc kilkukrotnie spowalnia alokacje i zafałszowałby czas
+    tracemalloc.start()
+    result = parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(times), peak
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark full vs targeted parsing of the champions page')
+    parser.add_argument('page', nargs='?', default='mistrzostwa_polski_w_szachach.html', help='Saved copy of the page (downloaded if missing)')
+    parser.add_argument('--repeat', '-r', type=int, default=5, help='Timed repetitions per parser')
+    args = parser.parse_args()
+
+    html = load_page(args.page)
+    full, full_time, full_peak = measure(parse_champions, html, args.repeat)
+    targeted, targeted_time, targeted_peak = measure(parse_champions_targeted, html, args.repeat)
+
+    print(f"strona: {len(html) / 1024:.0f} KiB, parser: {PARSER}, wiersze: {len(full)} / {len(targeted)}"
+          f"{'' if full == targeted else ' - WYNIKI RÓŻNE!'}")
+    print(f"parse_champions:          {full_time * 1000:8.1f} ms, szczyt pamięci {full_peak / 2**20:6.1f} MiB")
+    print(f"parse_champions_targeted: {targeted_time * 1000:8.1f} ms, szczyt pamięci {targeted_peak / 2**20:6.1f} MiB")
+    print(f"przyspieszenie {full_time / targeted_time:.1f}x, pamięć {full_peak / targeted_peak:.1f}x mniej")
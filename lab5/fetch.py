@@ -0,0 +1,116 @@
+import threading
+import time
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Wspólna warstwa pobierania dla scraperów: jedna sesja z pulą połączeń (keep-alive zamiast nowego
+# połączenia TCP/TLS na każdy adres), ponawianie z wykładniczym odstępem, limity czasu,
+# ograniczenie liczby równoczesnych żądań i tempa żądań do jednego hosta.
+
+USER_AGENT = 'Python2024-scraper/1.0 (+https://github.com/hubixr/Python2024)'
+# (połączenie, odczyt) w sekundach
+TIMEOUT = (5, 30)
+
+def make_session(pool_size=10, retries=3, backoff=0.5):
+    # ponawia błędy połączenia oraz odpowiedzi 429/5xx, czekając backoff * 2**(próba - 1) s
+    # (albo tyle, ile każe nagłówek Retry-After)
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET', 'HEAD']))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# najwyżej rate żądań na sekundę do każdego hosta, wspólne dla wszystkich wątków
+class HostRateLimiter:
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_time = {}
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        # rezerwacja terminu pod blokadą, samo czekanie już bez niej - inne hosty nie czekają
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time.get(host, now))
+            self.next_time[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def fetch(session, url, timeout=TIMEOUT, limiter=None, cache=None):
+    # z cache (http_cache.ResponseCache): świeży wpis bez sieci, starszy - żądanie warunkowe
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return cache.response(entry)
+    if limiter is not None:
+        limiter.wait(url)
+    response = session.get(url, timeout=timeout, headers=cache.validators(entry) if entry else None)
+    if response.status_code == 304 and entry is not None:
+        return cache.revalidated(entry, response)
+    response.raise_for_status()
+    if cache is not None:
+        cache.store(url, response)
+    return response
+
+def fetch_all(urls, session=None, concurrency=8, rate=None, timeout=TIMEOUT, cache=None):
+    # pobiera adresy równolegle i zwraca pary (url, odpowiedź) w kolejności ukończenia
+    # w locie jest najwyżej concurrency żądań, więc urls może być leniwym iteratorem dowolnej długości;
+    # nieudane żądanie daje wyjątek zamiast odpowiedzi i nie zatrzymuje pozostałych
+    session = session or make_session(pool_size=concurrency)
+    limiter = HostRateLimiter(rate) if rate else None
+    urls = iter(urls)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+
+        def submit(count):
+            for url in urls:
+                pending[executor.submit(fetch, session, url, timeout, limiter, cache)] = url
+                count -= 1
+                if count == 0:
+                    break
+
+        submit(concurrency)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                error = future.exception()
+                yield url, error if error is not None else future.result()
+            submit(len(done))
+
+def parse_all(responses, parse, max_workers=None, max_pending=None):
+    # parse(response.text) dla par (url, odpowiedź) z fetch_all w puli procesów, wyniki (url, wynik) w kolejności
+    # ukończenia: I/O zostaje na wątkach fetch_all, parsowanie (CPU) korzysta ze wszystkich rdzeni
+    # w puli czeka najwyżej max_pending stron - dalsze nie są pobierane z responses, więc pobieranie
+    # się wstrzymuje zamiast trzymać HTML w pamięci; wyjątki (z pobierania lub parsowania) zamiast wyniku;
+    # parse musi być funkcją z poziomu modułu (pickle)
+    max_workers = max_workers or os.cpu_count()
+    max_pending = max_pending or 2 * max_workers
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def finished(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                url = pending.pop(future)
+                error = future.exception()
+                yield url, error if error is not None else future.result()
+
+        for url, response in responses:
+            if isinstance(response, Exception):
+                yield url, response
+                continue
+            pending[executor.submit(parse, response.text)] = url
+            if len(pending) >= max_pending:
+                yield from finished(FIRST_COMPLETED)
+        while pending:
+            yield from finished(FIRST_COMPLETED)
@@ -0,0 +1,99 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Dyskowy cache odpowiedzi HTTP: treść skompresowana zlib razem z ETag/Last-Modified w jednym pliku SQLite.
+# Świeży wpis (młodszy niż ttl) jest zwracany bez sieci, starszy jest sprawdzany żądaniem warunkowym
+# (If-None-Match / If-Modified-Since) - jeśli strona się nie zmieniła, serwer odpowiada pustym 304.
+# Po przekroczeniu max_bytes usuwane są najdawniej używane wpisy.
+
+DEFAULT_PATH = '.http_cache.sqlite'
+# nagłówki opisujące przesłaną postać treści - w cache jest już zdekodowana
+SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_PATH, ttl=3600, max_bytes=100 << 20):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # jedno połączenie dla wszystkich wątków, dostęp szeregowany blokadą
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT, '
+                            'last_modified TEXT, encoding TEXT, headers TEXT, body BLOB, size INTEGER, '
+                            'fetched REAL, accessed REAL)')
+            # plik mógł zostać zapisany z większym limitem
+            self.evict()
+
+    def get(self, url):
+        with self.lock, self.db:
+            row = self.db.execute('SELECT etag, last_modified, encoding, headers, body, fetched FROM responses '
+                                  'WHERE url = ?', (url,)).fetchone()
+            if row is not None:
+                self.db.execute('UPDATE responses SET accessed = ? WHERE url = ?', (time.time(), url))
+        if row is None:
+            return None
+        etag, last_modified, encoding, headers, body, fetched = row
+        return {'url': url, 'etag': etag, 'last_modified': last_modified, 'encoding': encoding,
+                'headers': headers, 'body': body, 'fetched': fetched}
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched'] < self.ttl
+
+    def validators(self, entry):
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response):
+        headers = {key: value for key, value in response.headers.items() if key.lower() not in SKIPPED_HEADERS}
+        body = zlib.compress(response.content)
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            (url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                             response.encoding, json.dumps(headers), body, len(body), now, now))
+            self.evict()
+
+    def revalidated(self, entry, response):
+        # 304: treść bez zmian, odświeżony czas pobrania i ewentualnie nowe walidatory
+        etag = response.headers.get('ETag', entry['etag'])
+        last_modified = response.headers.get('Last-Modified', entry['last_modified'])
+        with self.lock, self.db:
+            self.db.execute('UPDATE responses SET etag = ?, last_modified = ?, fetched = ? WHERE url = ?',
+                            (etag, last_modified, time.time(), entry['url']))
+        return self.response(entry)
+
+    def evict(self):
+        # wywoływane pod blokadą: usuwa najdawniej używane wpisy, aż suma rozmiarów zmieści się w limicie
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self.db.execute('SELECT url, size FROM responses ORDER BY accessed').fetchall():
+            self.db.execute('DELETE FROM responses WHERE url = ?', (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def response(self, entry):
+        # odtworzenie requests.Response z wpisu, żeby kod parsujący nie odróżniał cache od sieci
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(json.loads(entry['headers']))
+        response.encoding = entry['encoding']
+        response._content = zlib.decompress(entry['body'])
+        response.from_cache = True
+        return response
+
+    def close(self):
+        with self.lock:
+            self.db.close()
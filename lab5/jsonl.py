@@ -0,0 +1,125 @@
+import gzip
+import json
+import os
+import zlib
+
+# Zapis rekordów w formacie JSON Lines (jeden obiekt JSON w wierszu) na bieżąco, zamiast jednego json.dump na końcu.
+# Plik z końcówką .gz jest kompresowany: każda paczka to osobny człon gzip, więc przerwany zapis psuje
+# najwyżej ostatni człon. Przy ponownym otwarciu niedokończona końcówka pliku jest obcinana, a dopisywanie
+# kontynuuje od ostatniego kompletnego rekordu.
+
+CHUNK_SIZE = 1 << 16
+
+def is_gzip(path):
+    return path.endswith('.gz')
+
+def complete_length(path):
+    # długość początku pliku złożonego z kompletnych wierszy (lub kompletnych członów gzip)
+    with open(path, 'rb') as file:
+        if not is_gzip(path):
+            file.seek(0, os.SEEK_END)
+            end = file.tell()
+            while end > 0:
+                file.seek(max(0, end - CHUNK_SIZE))
+                chunk = file.read(end - file.tell())
+                newline = chunk.rfind(b'\n')
+                if newline >= 0:
+                    return end - len(chunk) + newline + 1
+                end -= len(chunk)
+            return 0
+        # kolejne człony gzip: granica członu to miejsce, w którym dekompresor zgłasza koniec strumienia
+        length = consumed = 0
+        decompressor = zlib.decompressobj(wbits=31)
+        while chunk := file.read(CHUNK_SIZE):
+            consumed += len(chunk)
+            while chunk:
+                try:
+                    decompressor.decompress(chunk)
+                except zlib.error:
+                    return length
+                if not decompressor.eof:
+                    break
+                chunk = decompressor.unused_data
+                length = consumed - len(chunk)
+                decompressor = zlib.decompressobj(wbits=31)
+        return length
+
+# Dopisuje rekordy do pliku JSON Lines paczkami po batch_size. Rekordy jednej strony najlepiej przekazać razem
+# do write_many - paczka nie skończy się wtedy w połowie strony, a wznowienie (done_keys) nie pominie
+# częściowo zapisanej strony.
+class JsonLinesWriter:
+
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+        if os.path.exists(path):
+            with open(path, 'r+b') as file:
+                file.truncate(complete_length(path))
+        self.file = open(path, 'ab')
+
+    def write(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        self.buffer.extend(json.dumps(record, ensure_ascii=False) for record in records)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data = ('\n'.join(self.buffer) + '\n').encode('utf-8')
+        self.file.write(gzip.compress(data) if is_gzip(self.path) else data)
+        self.file.flush()
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def complete_lines(path):
+    # tylko kompletne wiersze - bez urwanej końcówki pliku albo urwanego ostatniego członu gzip,
+    # czyli dokładnie to, co zostawi JsonLinesWriter po ponownym otwarciu pliku
+    if not is_gzip(path):
+        with open(path, 'rb') as file:
+            for line in file:
+                if line.endswith(b'\n'):
+                    yield line
+        return
+    with open(path, 'rb') as file:
+        decompressor = zlib.decompressobj(wbits=31)
+        member = []
+        while chunk := file.read(CHUNK_SIZE):
+            while chunk:
+                try:
+                    member.append(decompressor.decompress(chunk))
+                except zlib.error:
+                    return
+                if not decompressor.eof:
+                    break
+                # człon to jedna paczka, więc w pamięci jest najwyżej batch_size wierszy
+                yield from b''.join(member).splitlines(keepends=True)
+                member = []
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=31)
+
+def read_jsonl(path):
+    # leniwie, rekord po rekordzie, bez wczytywania całego pliku
+    for line in complete_lines(path):
+        if line.strip():
+            yield json.loads(line)
+
+def done_keys(path, key='url'):
+    # wartości pola key z rekordów już zapisanych - do pomijania gotowych stron po wznowieniu
+    if not os.path.exists(path):
+        return set()
+    return {record[key] for record in read_jsonl(path) if key in record}
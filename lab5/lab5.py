@@ -1,27 +1,74 @@
-import requests
-from bs4 import BeautifulSoup
-import json
+from bs4 import BeautifulSoup, SoupStrainer
+import sys
+
+try:
+  import lxml  # noqa: F401 - szybszy parser w C, jeśli jest zainstalowany
+  PARSER = 'lxml'
+except ImportError:
+  PARSER = 'html.parser'
+
+from fetch import fetch, make_session
+from http_cache import ResponseCache
+from jsonl import JsonLinesWriter, done_keys
 
 url = "https://pl.wikipedia.org/wiki/Mistrzostwa_Polski_w_szachach"
-res = requests.get(url)
 
 
-soup = BeautifulSoup(res.text, 'html.parser')
-mistrzowie = []
+def parse_champions(html):
+  soup = BeautifulSoup(html, 'html.parser')
+  mistrzowie = []
+
+  for row in soup.select('table tbody tr'):  # wskaznie miejsca gdzie są interesujące nas dane
+    columns = row.find_all(['td'])
+    if len(columns) == 6:  #6 kolumn bo tyle ma tabela z której biorę dane
+      rok = columns[1].get_text(strip=True)
+      lokalizacja = columns[2].get_text(strip=True)
+      zwyciezca = columns[3].get_text(strip=True)
+      drugie = columns[4].get_text(strip=True)
+      trzecie = columns[5].get_text(strip=True)
+      mistrzowie.append({"Rok": rok, "Lokalizacja": lokalizacja, "1 Miejsce": zwyciezca, "2 Miejsce": drugie, "3 Miejsce": trzecie})
+  return mistrzowie
+
+
+def is_champions_table(table):
+  # tabela wyników: pierwszy wiersz to nagłówek z 6 kolumnami, w tym "Rok"
+  header = table.find('tr')
+  cells = header.find_all(['th', 'td']) if header else []
+  return len(cells) == 6 and any(cell.get_text(strip=True).lower().startswith('rok') for cell in cells)
+
+
+def parse_champions_targeted(html):
+  # drzewo tylko z tabel (SoupStrainer pomija resztę dokumentu), tabele wyników rozpoznane raz po nagłówku
+  # (bez tabel zagnieżdżonych - ich wiersze są już w tabeli nadrzędnej)
+  soup = BeautifulSoup(html, PARSER, parse_only=SoupStrainer('table'))
+  targets = [table for table in soup.find_all('table')
+             if is_champions_table(table) and table.find_parent('table') is None]
+  if targets:
+    rows = [row for table in targets for row in table.select('tbody tr')]
+  else:
+    # nagłówek strony się zmienił - ten sam selektor co parse_champions, każdy wiersz raz
+    print("parse_champions_targeted: nie znaleziono tabeli wyników po nagłówku, przeglądam wszystkie tabele", file=sys.stderr)
+    rows = soup.select('table tbody tr')
+  mistrzowie = []
+
+  for row in rows:
+    columns = row.find_all('td')
+    if len(columns) == 6:
+      rok, lokalizacja, zwyciezca, drugie, trzecie = (column.get_text(strip=True) for column in columns[1:])
+      mistrzowie.append({"Rok": rok, "Lokalizacja": lokalizacja, "1 Miejsce": zwyciezca, "2 Miejsce": drugie, "3 Miejsce": trzecie})
+  return mistrzowie
 
-for row in soup.select('table tbody tr'):  # wskaznie miejsca gdzie są interesujące nas dane
-  columns = row.find_all(['td'])  
-  if len(columns) == 6:  #6 kolumn bo tyle ma tabela z której biorę dane
-    rok = columns[1].get_text(strip=True)
-    lokalizacja = columns[2].get_text(strip=True)
-    zwyciezca = columns[3].get_text(strip=True) 
-    drugie = columns[4].get_text(strip=True)
-    trzecie = columns[5].get_text(strip=True)
-    mistrzowie.append({"Rok": rok, "Lokalizacja": lokalizacja, "1 Miejsce": zwyciezca, "2 Miejsce": drugie, "3 Miejsce": trzecie})
- 
 
+if __name__ == "__main__":
+  # adres strony można podać jako argument, np. lokalny serwer z zapisaną stroną
+  page_url = sys.argv[1] if len(sys.argv) > 1 else url
+  # JSON Lines, każdy wiersz z adresem strony; nazwa z .gz - plik kompresowany
+  output_file = sys.argv[2] if len(sys.argv) > 2 else "mistrzowie_polski_szachy.jsonl"
 
-#print(mistrzowie)
-output_file = "mistrzowie_polski_szachy.json"
-with open(output_file, 'w', encoding='utf-8') as file:
-  json.dump(mistrzowie, file, ensure_ascii=False, indent=4)
+  if page_url in done_keys(output_file):
+    print(f"{page_url} już jest w {output_file}")
+  else:
+    # kolejne uruchomienia w ciągu godziny czytają stronę z cache, później tylko sprawdzają, czy się zmieniła
+    res = fetch(make_session(), page_url, cache=ResponseCache())
+    with JsonLinesWriter(output_file) as writer:
+      writer.write_many({"url": page_url, **mistrz} for mistrz in parse_champions_targeted(res.text))
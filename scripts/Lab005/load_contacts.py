@@ -1,6 +1,25 @@
 import json
+import os
+import sys
 
-with open('scripts/Lab005/contacts.json') as file:
-    contacts = json.load(file)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'lab5'))
+from jsonl import read_jsonl
 
-print(contacts)    
\ No newline at end of file
+def iter_contacts(path):
+    # rekord po rekordzie, bez wczytywania całego pliku (także .jsonl.gz)
+    yield from read_jsonl(path)
+
+def load_contacts(path='scripts/Lab005/contacts.json'):
+    # pliki z static_scraping.py (JSON Lines) czytane strumieniowo, zwykły JSON jak dotąd
+    if path.endswith(('.jsonl', '.jsonl.gz')):
+        return iter_contacts(path)
+    with open(path) as file:
+        return json.load(file)
+
+if __name__ == "__main__":
+    contacts = load_contacts(*sys.argv[1:])
+    if isinstance(contacts, dict):
+        print(contacts)
+    else:
+        for contact in contacts:
+            print(contact)
@@ -1,50 +1,72 @@
-import requests
 from bs4 import BeautifulSoup
-import json
+import argparse
+import os
+import sys
 
-url = 'https://www.bip.pw.edu.pl/Sklad-osobowy/Podstawowe-jednostki-organizacyjne/Wydzial-Fizyki/Pracownicy-wydzialu'
-res = requests.get(url)
+# wspólna warstwa pobierania z lab5 (sesja z pulą połączeń, ponawianie, limity)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'lab5'))
+from fetch import fetch_all, parse_all
+from http_cache import ResponseCache
+from jsonl import JsonLinesWriter, done_keys
 
-# print(res.status_code)
-# print(res.headers)
-# print(res.text)
+url = 'https://www.bip.pw.edu.pl/Sklad-osobowy/Podstawowe-jednostki-organizacyjne/Wydzial-Fizyki/Pracownicy-wydzialu'
 
-soup = BeautifulSoup(res.text, 'html.parser')
+def parse_staff(html):
+    soup = BeautifulSoup(html, 'html.parser')
 
-main_div = soup.find('div', class_ = 'class-folder')
+    main_div = soup.find('div', class_ = 'class-folder')
 
-# for name in main_div.find_all('h2'):
-#     print(name.text.strip().replace('\n', ''))  
-#     print('-----------------')
+    # for name in main_div.find_all('h2'):
+    #     print(name.text.strip().replace('\n', ''))
+    #     print('-----------------')
 
-employee_data = main_div.find_all('div', class_ = 'class-pracownik')
-#employee_data = main_div.select('div.class-pracownik')
+    employee_data = main_div.find_all('div', class_ = 'class-pracownik')
+    #employee_data = main_div.select('div.class-pracownik')
 
-employee_contact_data = {}
+    employee_contact_data = {}
 
-for employee in employee_data:
-    # name = employee.find('a')['title']
-    name = employee.find('a').text.strip().replace('\n', '').replace('  ', ' ')
-    # tel. miejski:
-    phone = employee.find('b', text = 'tel. miejski:')
-    if phone is not None:
-        phone = phone.next_sibling.strip()
-    email = employee.find('b', text = 'e-mail:')
-    if email is not None:
-        email = email.find_next_siblings(string=True)
-        email = '.'.join(email[:-1]).strip()
+    for employee in employee_data:
+        # name = employee.find('a')['title']
+        name = employee.find('a').text.strip().replace('\n', '').replace('  ', ' ')
+        # tel. miejski:
+        phone = employee.find('b', text = 'tel. miejski:')
+        if phone is not None:
+            phone = phone.next_sibling.strip()
+        email = employee.find('b', text = 'e-mail:')
+        if email is not None:
+            email = email.find_next_siblings(string=True)
+            email = '.'.join(email[:-1]).strip()
 
-    employee_contact_data[name] = {
-        'phone': phone,
-        'email': email
-    }
+        employee_contact_data[name] = {
+            'phone': phone,
+            'email': email
+        }
+    return employee_contact_data
 
-    print(f'{name=}')
-    print(f'{phone=}')
-    print(f'{email=}')
-    print('-----------------')
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scrape staff contacts')
+    # strony do przejrzenia (np. podstrony albo lokalny serwer z zapisanymi stronami)
+    parser.add_argument('urls', nargs='*', default=[url], help='Pages to scrape')
+    parser.add_argument('--output', '-o', default='scripts/Lab005/contacts.jsonl', help='JSON Lines output, gzip-compressed if it ends with .gz')
+    parser.add_argument('--batch-size', type=int, default=100, help='Records buffered before each write')
+    args = parser.parse_args()
 
-print(employee_contact_data)
+    # wznowienie: strony, których rekordy są już w pliku, nie są pobierane ponownie
+    done = done_keys(args.output)
+    urls = [page_url for page_url in args.urls if page_url not in done]
+    print(f'{len(args.urls) - len(urls)} pages already scraped, {len(urls)} to go')
 
-with open('scripts/Lab005/contacts.json', 'w') as file:
-    json.dump(employee_contact_data, file, indent=4)
\ No newline at end of file
+    # pobieranie na wątkach, parsowanie stron w procesach (jak w Lab010), wyniki w kolejności ukończenia
+    responses = fetch_all(urls, concurrency=8, rate=2, cache=ResponseCache())
+    with JsonLinesWriter(args.output, batch_size=args.batch_size) as writer:
+        for page_url, contacts in parse_all(responses, parse_staff):
+            if isinstance(contacts, Exception):
+                print(f'{page_url}: {contacts}')
+                continue
+            for name, contact in contacts.items():
+                print(f'{name=}')
+                print(f"phone={contact['phone']!r}")
+                print(f"email={contact['email']!r}")
+                print('-----------------')
+            # rekordy jednej strony razem, żeby paczka nie kończyła się w połowie strony
+            writer.write_many({'url': page_url, 'name': name, **contact} for name, contact in contacts.items())